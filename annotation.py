@@ -0,0 +1,96 @@
+"""
+Compact chapter-annotation protocol.
+
+The annotation prompt used to send the whole paper with `indent=2` and ask for the
+same array back with "chapter"/"chapter_name" inserted, so the output was as long
+as the paper (Hindi `prashna`/`vikalpa` copies included) and long rewritten text
+was the main source of parse failures. Now the model sees only id, type and the
+question text, and answers with `{"obj_1": 3, "short_2": 11, ...}`; the chapter
+fields are merged back locally with `apply_chapters`.
+"""
+import json
+import re
+
+# Mirrored Hindi/Sanskrit copies and answers don't help classification
+SKIPPED_FIELDS = {"prashna", "vikalpa", "anuprashna", "answer", "answers", "uttar", "marks", "instructions"}
+MAX_CONTEXT_CHARS = 400  # passages are only needed to recognise the chapter
+
+_LEADING_NUMBER = re.compile(r"\s*(\d+)")
+
+
+def _compact_value(value):
+    if isinstance(value, str):
+        return value if len(value) <= MAX_CONTEXT_CHARS else value[:MAX_CONTEXT_CHARS] + "…"
+    if isinstance(value, dict):
+        return " | ".join(str(_compact_value(v)) for v in value.values())
+    if isinstance(value, list):
+        return " | ".join(str(_compact_value(v)) for v in value)
+    return value
+
+
+def compact_questions(questions: list) -> str:
+    """One minified JSON object per line with only the fields that identify the chapter."""
+    lines = []
+    for q in questions:
+        if not isinstance(q, dict):
+            continue
+        compact = {k: _compact_value(v) for k, v in q.items() if k not in SKIPPED_FIELDS and v not in (None, "", [], {})}
+        lines.append(json.dumps(compact, ensure_ascii=False, separators=(",", ":")))
+    return "[\n" + ",\n".join(lines) + "\n]"
+
+
+def chapter_number(value):
+    """The chapter number in an answer (3, "3", "3. Name" or {"chapter": 3}), or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, dict):
+        value = value.get("chapter")
+    match = _LEADING_NUMBER.match(str(value)) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+def apply_chapters(questions: list, chapter_map: dict, chapters: list):
+    """
+    Inserts "chapter" (the number, as a string) and "chapter_name" right after "type"
+    in every question whose id has a valid chapter in `chapter_map`.
+
+    Returns:
+        (annotated questions, ids without a valid chapter)
+    """
+    annotated = []
+    missing = []
+    for q in questions:
+        if not isinstance(q, dict):
+            annotated.append(q)
+            continue
+        number = chapter_number(chapter_map.get(str(q.get("id"))))
+        if number is None or not 1 <= number <= len(chapters):
+            missing.append(q.get("id"))
+            annotated.append(q)
+            continue
+
+        fields = {"chapter": str(number), "chapter_name": chapters[number - 1]}
+        new_q = {}
+        for k, v in q.items():
+            if k in fields:
+                continue
+            new_q[k] = v
+            if k == "type":
+                new_q.update(fields)
+        if "type" not in q:
+            new_q.update(fields)
+        annotated.append(new_q)
+    return annotated, missing
+
+
+def chapter_map_from_annotated(annotated: list) -> dict:
+    """`{id: chapter number}` of a paper annotated with the old full-echo protocol."""
+    chapter_map = {}
+    for q in annotated:
+        if isinstance(q, dict) and "id" in q:
+            number = chapter_number(q.get("chapter"))
+            if number is not None:
+                chapter_map[str(q["id"])] = number
+    return chapter_map
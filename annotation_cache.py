@@ -0,0 +1,226 @@
+"""
+Question-level chapter cache.
+
+Bihar board papers repeat questions from year to year and between shift i and
+shift ii. Every chapter Gemini assigns is stored under the SHA-256 of the subject
+and the normalized full text of the question - its passage, sub-questions and
+options included (dedup_index.question_text, textnorm.py) - so a repeated
+question is labelled from the cache before the prompt is built and only misses
+are sent, while generic stems ("Read the passage and answer...") over different
+passages stay apart. Option order does not matter.
+
+Each entry records the hash of the subject's chapter list it was answered
+against; when the syllabus changes, the subject's old entries are dropped the
+next time its cache is opened. Least recently used entries are evicted beyond
+ANNOTATION_CACHE_MAX_ENTRIES.
+
+    .pipeline/annotation_cache.sqlite3
+
+Usage:
+    python annotation_cache.py seed [subjects...]   # import existing annotated papers
+    python annotation_cache.py stats
+    python annotation_cache.py clear
+
+Set ANNOTATION_CACHE=0 to bypass the cache.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import annotation
+import chapter_classifier
+import dedup_index
+import subjects
+import textnorm
+
+DEFAULT_PATH = ".pipeline/annotation_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 200_000
+# Bumped whenever question_key changes; entries of older versions are dropped on open
+KEY_VERSION = 2
+
+
+def syllabus_hash(chapters: list) -> str:
+    return hashlib.sha256(json.dumps(chapters, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def question_key(subject_name: str, question: dict):
+    """Content hash of (subject, question text with passage, sub-questions and options), or None if it has no text."""
+    text = textnorm.normalize(dedup_index.question_text(question))
+    if not text:
+        return None
+    return hashlib.sha256(f"{subject_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class AnnotationCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, subject TEXT, syllabus TEXT, chapter INTEGER, chapter_name TEXT,"
+            " last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != KEY_VERSION:
+            # Keys from another question_key version would never match (or match the wrong question)
+            self._db.execute("DELETE FROM entries")
+            self._db.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        self._db.commit()
+
+    def invalidate(self, subject_name: str, syllabus: str) -> int:
+        """Drops the subject's entries answered against another chapter list. Returns how many."""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM entries WHERE subject = ? AND syllabus != ?",
+                                      (subject_name, syllabus))
+            self._db.commit()
+        return cursor.rowcount
+
+    def lookup(self, subject_name: str, syllabus: str, questions: list) -> dict:
+        """`{id: chapter}` for the questions already in the cache."""
+        keys = {}
+        for q in questions:
+            if isinstance(q, dict) and "id" in q:
+                key = question_key(subject_name, q)
+                if key:
+                    keys.setdefault(key, []).append(str(q["id"]))
+        if not keys:
+            return {}
+
+        chapter_map = {}
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._db.execute(
+                f"SELECT key, chapter FROM entries WHERE syllabus = ? AND key IN ({placeholders})",
+                [syllabus, *keys],
+            ).fetchall()
+            self._db.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                 [(time.time(), key) for key, _ in rows])
+            self._db.commit()
+        for key, chapter in rows:
+            for qid in keys[key]:
+                chapter_map[qid] = chapter
+        return chapter_map
+
+    def store(self, subject_name: str, syllabus: str, chapters: list, questions: list, chapter_map: dict) -> int:
+        """Records the chapter of every question with a valid entry in `chapter_map`. Returns how many."""
+        rows = []
+        now = time.time()
+        for q in questions:
+            if not isinstance(q, dict) or "id" not in q:
+                continue
+            number = annotation.chapter_number(chapter_map.get(str(q["id"])))
+            key = question_key(subject_name, q)
+            if key and number is not None and 1 <= number <= len(chapters):
+                rows.append((key, subject_name, syllabus, number, chapters[number - 1], now))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, subject, syllabus, chapter, chapter_name, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        self.evict()
+        return len(rows)
+
+    def evict(self):
+        """Drops least recently used entries beyond `max_entries`."""
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count <= self.max_entries:
+                return
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT subject, COUNT(*) FROM entries GROUP BY subject").fetchall()
+        return dict(rows)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+
+class SubjectCache:
+    """The cache bound to one subject and its current chapter list, as used by async_engine.annotate_paper."""
+
+    def __init__(self, cache: AnnotationCache, subject_name: str, chapters: list):
+        self.cache = cache
+        self.subject_name = subject_name
+        self.chapters = chapters
+        self.syllabus = syllabus_hash(chapters)
+        cache.invalidate(subject_name, self.syllabus)
+
+    def lookup(self, questions: list) -> dict:
+        return self.cache.lookup(self.subject_name, self.syllabus, questions)
+
+    def store(self, questions: list, chapter_map: dict) -> int:
+        return self.cache.store(self.subject_name, self.syllabus, self.chapters, questions, chapter_map)
+
+
+_shared_cache = None
+_subject_caches = {}
+_shared_lock = threading.Lock()
+
+
+def _open() -> AnnotationCache:
+    return AnnotationCache(
+        path=os.environ.get("ANNOTATION_CACHE_PATH", DEFAULT_PATH),
+        max_entries=int(os.environ.get("ANNOTATION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
+
+
+def for_subject(subject):
+    """The process-wide cache for the subject, or None when disabled with ANNOTATION_CACHE=0."""
+    global _shared_cache
+    if os.environ.get("ANNOTATION_CACHE", "1") == "0":
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = _open()
+        if subject.name not in _subject_caches:
+            _subject_caches[subject.name] = SubjectCache(_shared_cache, subject.name, subject.chapters)
+        return _subject_caches[subject.name]
+
+
+# --- Seeding from existing annotated papers ---
+
+def seed_subject(cache: AnnotationCache, subject) -> int:
+    """Stores the chapters of `{subject}_data_annotated`, skipping ids labelled by the local classifier."""
+    subject_cache = SubjectCache(cache, subject.name, subject.chapters)
+    seeded = 0
+    for path in sorted(subject.annotated_dir.glob(f"{subject.prefix}_*.json")):
+        try:
+            labelled = chapter_classifier.labelled_questions(path, chapter_classifier.local_ids(subject, path.stem))
+        except (OSError, ValueError):
+            continue
+        seeded += subject_cache.store([q for q, _ in labelled], {str(q["id"]): c for q, c in labelled})
+    return seeded
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = _open()
+
+    if command == "seed":
+        for name in sys.argv[2:] or subjects.NAMES:
+            print(f"🌱 {name}: seeded {seed_subject(cache, subjects.get(name))} questions")
+    elif command == "clear":
+        cache.clear()
+        print("🧹 Cache cleared")
+
+    stats = cache.stats()
+    print(f"📦 {sum(stats.values())} questions cached"
+          + "".join(f"\n   {name}: {count}" for name, count in sorted(stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+"""
+Asyncio extraction engine.
+
+Drives upload, generation and parsing for each paper as coroutines, so a
+single process can keep dozens of papers in flight without a thread per paper.
+The orchestrator and the interactive process_*_paper.py scripts go through
+`extract_paper`; annotation goes through `annotate_paper`.
+"""
+import asyncio
+import functools
+import json
+import pathlib
+import time
+import utils
+import json_repair
+import upload_registry
+import annotation
+import chapter_classifier
+import continuation
+import job_store
+import page_shards
+import paper_sections
+import response_schemas
+import wire_schema
+from stream_parser import IncrementalQuestionParser
+
+DEFAULT_MODEL = "models/gemini-3-flash-preview"
+DEFAULT_CONCURRENCY = 16
+ANNOTATION_ROUNDS = 2   # calls per paper: the first one, then one for the ids left without a chapter
+
+
+def decode_questions(questions: list, compact: bool = False, generation_config=None, mirrored_fields=None) -> list:
+    """Model output -> the schema written to disk: wire keys, labelled sub-question lists, then the mirrors."""
+    if compact:
+        questions = wire_schema.decode(questions)
+    if generation_config:
+        questions = response_schemas.decode(questions)
+    return utils.expand_mirrored_fields(questions, mirrored_fields)
+
+
+def raw_folder_for(output_path: pathlib.Path) -> pathlib.Path:
+    """`science_data/sci_2011i.json` -> `science_data_raw/`"""
+    output_parent = output_path.parent
+    return output_parent.parent / (output_parent.name + "_raw")
+
+
+async def generate_from_pdf(model, input_path: pathlib.Path, prompt_builder, logger, generation_config=None):
+    """
+    Runs the extraction prompt against the PDF, uploading it unless a valid upload
+    of the same bytes is registered. Deleting the upload is left to the reaper
+    (see upload_registry.py) so later stages and re-runs can reuse it.
+
+    Raises:
+        Exception: If the upload or the API call fails after retries.
+    """
+    try:
+        uploaded_file = await upload_registry.get_or_upload_async(input_path, logger)
+    except Exception as e:
+        logger.error(f"Failed to upload file: {e}")
+        raise
+
+    logger.info("Generating content with Gemini...")
+    prompt_parts = prompt_builder(uploaded_file.uri)
+    response = await utils.generate_content_with_retry_async(
+        model, prompt_parts, logger=logger, source_files=[input_path], generation_config=generation_config
+    )
+    if not response:
+        logger.error("Skipping this file due to API failure.")
+        raise Exception("API call failed after retries")
+    return response
+
+
+async def stream_from_pdf(model, input_path: pathlib.Path, prompt_builder, raw_path: pathlib.Path, logger,
+                         compact: bool = False, generation_config=None, mirrored_fields: dict = None):
+    """
+    Streams the extraction (`stream=True`), appending every chunk to the raw file and every
+    completed question to an NDJSON sidecar (`{stem}.ndjson` next to the raw file) as it arrives.
+
+    Returns:
+        (response, parser) - the parser holds every question completed so far.
+
+    A stream that breaks off mid-way is returned as it is (`response.complete` is False);
+    extract_paper salvages and continues it. Sidecar questions are decoded and expanded
+    (decode_questions) before they are written, so they have the shape of the final JSON.
+
+    Raises:
+        Exception: If the upload or the API call fails before the first chunk.
+    """
+    try:
+        uploaded_file = await upload_registry.get_or_upload_async(input_path, logger)
+    except Exception as e:
+        logger.error(f"Failed to upload file: {e}")
+        raise
+
+    logger.info("Streaming content from Gemini...")
+    prompt_parts = prompt_builder(uploaded_file.uri)
+    parser = IncrementalQuestionParser()
+    ndjson_path = raw_path.with_name(f"{input_path.stem}.ndjson")
+    start = time.time()
+
+    with open(raw_path, 'w', encoding='utf-8') as raw_f, open(ndjson_path, 'w', encoding='utf-8') as ndjson_f:
+        def on_text(text):
+            raw_f.write(text)
+            raw_f.flush()
+            for question in parser.feed(text):
+                if len(parser.questions) == 1:
+                    logger.info(f"⚡ First question after {time.time() - start:.1f}s")
+                [question] = decode_questions([question], compact, generation_config, mirrored_fields)
+                ndjson_f.write(json.dumps(question, ensure_ascii=False) + "\n")
+            ndjson_f.flush()
+
+        response = await utils.stream_content_with_retry_async(
+            model, prompt_parts, on_text, logger=logger, source_files=[input_path],
+            generation_config=generation_config
+        )
+
+    if not response:
+        logger.error("Skipping this file due to API failure.")
+        raise Exception("API call failed after retries")
+    if not getattr(response, "complete", True):
+        logger.warning(f"Stream broke off; {len(parser.questions)} questions kept in {ndjson_path}")
+    logger.info(f"Raw API response streamed to: {raw_path}")
+    return response, parser
+
+
+async def extract_paper(input_pdf_path: str, output_json_path: str, prompt_builder, logger, model=None,
+                        stream: bool = False, usage: dict = None, mirrored_fields: dict = None,
+                        compact: bool = False, generation_config: dict = None):
+    """
+    Extracts one question paper PDF into structured JSON.
+
+    Args:
+        input_pdf_path: Path to the question paper PDF.
+        output_json_path: Where the extracted JSON array is written.
+        prompt_builder: `generate_extraction_prompt` of the subject's process_*_paper module.
+        logger: Logger instance.
+        model: Optional shared GenerativeModel; created on demand otherwise.
+        stream: Stream the generation and write questions as they arrive (see stream_from_pdf).
+        usage: Optional dict that accumulates `prompt_tokens` / `output_tokens` of every call.
+        mirrored_fields: `{source: mirror}` fields the prompt asks for once (the module's
+            MIRRORED_FIELDS); the mirrors are copied in before the JSON is written.
+        compact: Ask for the short-key wire format (wire_schema.py) and expand it locally.
+        generation_config: Structured output (response_schemas.extraction_config); the response
+            is parsed with one json.loads and decoded with response_schemas.decode.
+
+    Returns:
+        The extracted list of questions, or None if the response could not be parsed
+        (the raw response is preserved in `{subject}_data_raw/`).
+
+    Raises:
+        FileNotFoundError: If the input PDF does not exist.
+        Exception: If the upload or the API call fails after retries.
+    """
+    start_time = time.time()
+    logger.info(f"Starting processing for: {input_pdf_path}")
+
+    input_path = pathlib.Path(input_pdf_path)
+    if not input_path.exists():
+        logger.error(f"Input file not found at: {input_pdf_path}")
+        raise FileNotFoundError(f"Input file not found at: {input_pdf_path}")
+
+    # Prepare raw output folder
+    output_path = pathlib.Path(output_json_path)
+    raw_folder = raw_folder_for(output_path)
+    raw_folder.mkdir(exist_ok=True, parents=True)
+
+    if model is None:
+        model = utils.get_generative_model(model_name=DEFAULT_MODEL)
+    else:
+        utils.configure_genai()
+
+    raw_path = raw_folder / f"{input_path.stem}_raw.txt"
+    if compact:
+        prompt_builder = functools.partial(prompt_builder, compact=True)
+
+    # A cached response skips the upload as well as the generation
+    response = utils.get_cached_response(model, prompt_builder(""), source_files=[input_path], logger=logger,
+                                         generation_config=generation_config)
+    if response is None and stream:
+        response, _ = await stream_from_pdf(model, input_path, prompt_builder, raw_path, logger, compact=compact,
+                                            generation_config=generation_config, mirrored_fields=mirrored_fields)
+    else:
+        if response is None:
+            response = await generate_from_pdf(model, input_path, prompt_builder, logger,
+                                               generation_config=generation_config)
+
+        # Save raw response IMMEDIATELY
+        utils.atomic_write_text(raw_path, response.text)
+        logger.info(f"Raw API response saved to: {raw_path}")
+
+    utils.add_usage(usage, response)
+
+    logger.info("Cleaning and parsing the JSON response...")
+    try:
+        if generation_config:
+            data = response_schemas.loads(response.text, logger)
+        else:
+            data = json_repair.loads(response.text)
+    except json.JSONDecodeError as e:
+        # Cut off at the output token limit (or a broken stream): keep every complete
+        # question and ask for the rest instead of throwing the paper away
+        data, complete = continuation.salvage_questions(response.text)
+        if not data:
+            logger.error(f"Failed to decode JSON: {e}")
+            logger.error(f"Raw response is preserved in: {raw_path}")
+            return None
+        if complete:
+            # Every object parsed on its own; only the surrounding text is broken
+            logger.warning(f"Whole-response parse failed ({e}); using the {len(data)} salvaged questions")
+        else:
+            data = await continuation.continue_extraction(model, input_path, prompt_builder, data, raw_path, logger,
+                                                          usage=usage, generation_config=generation_config)
+
+    if isinstance(data, list):
+        data = decode_questions(data, compact, generation_config, mirrored_fields)
+
+    logger.info(f"Writing structured data to: {output_path}")
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    utils.atomic_write_json(output_path, data)
+    logger.info("Processing complete!")
+
+    execution_time = time.time() - start_time
+    logger.info(f"Time: {execution_time:.2f} seconds ({execution_time/60:.2f} minutes)")
+    return data
+
+
+async def extract_sharded(input_pdf_path: str, output_json_path: str, prompt_builder, logger, model=None,
+                          pages: int = page_shards.DEFAULT_PAGES, overlap: int = page_shards.DEFAULT_OVERLAP,
+                          **options):
+    """
+    extract_paper over overlapping page windows of the PDF, run concurrently and stitched
+    (see page_shards.py). Papers that fit in one window are extracted whole.
+
+    `options` (stream, usage, mirrored_fields, compact, generation_config) are passed to
+    every window's extract_paper. Window outputs and raw responses are kept in
+    `{subject}_data_raw/shards/` and `shards_raw/`.
+
+    Returns:
+        The stitched list of questions, or None if any window could not be parsed.
+
+    Raises:
+        RuntimeError: If pypdf is not installed.
+    """
+    input_path = pathlib.Path(input_pdf_path)
+    if not input_path.exists():
+        logger.error(f"Input file not found at: {input_pdf_path}")
+        raise FileNotFoundError(f"Input file not found at: {input_pdf_path}")
+    shards = page_shards.split_pdf(input_path, pages, overlap)
+    if not shards:
+        return await extract_paper(input_pdf_path, output_json_path, prompt_builder, logger, model=model, **options)
+
+    output_path = pathlib.Path(output_json_path)
+    shard_folder = raw_folder_for(output_path) / "shards"
+    page_count = shards[-1][1][1]
+    if model is None:
+        model = utils.get_generative_model(model_name=DEFAULT_MODEL)
+    logger.info(f"Extracting {input_path.name} as {len(shards)} windows of {pages} pages ({page_count} pages)")
+
+    def window_prompt(start, end):
+        def build(uploaded_file_uri: str, **kwargs) -> list:
+            return prompt_builder(uploaded_file_uri, **kwargs) + [{'text': page_shards.shard_note(start, end, page_count)}]
+        return build
+
+    start_time = time.time()
+    results = await asyncio.gather(*[
+        extract_paper(str(shard_pdf), str(shard_folder / f"{shard_pdf.stem}.json"), window_prompt(start, end),
+                      logger, model=model, **options)
+        for shard_pdf, (start, end) in shards
+    ])
+    if any(r is None for r in results):
+        logger.error(f"{input_path.name}: a page window could not be parsed (raw kept in {shard_folder}_raw)")
+        return None
+
+    data = page_shards.stitch_shards(results)
+    logger.info(f"Stitched {sum(len(r) for r in results)} window questions into {len(data)} "
+                f"in {time.time() - start_time:.2f}s")
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    utils.atomic_write_json(output_path, data)
+    return data
+
+
+async def extract_sections(input_pdf_path: str, output_json_path: str, prompt_builder, logger, model=None,
+                           **options):
+    """
+    extract_paper run once per paper section (Section A objective, Section B the rest),
+    concurrently against the same upload, then merged in id order (see paper_sections.py).
+
+    `options` are passed to both extract_paper calls. Section outputs and raw responses
+    are kept in `{subject}_data_raw/section_{a,b}/` and `section_{a,b}_raw/`.
+
+    Returns:
+        The merged list of questions, or None if either section could not be parsed.
+    """
+    output_path = pathlib.Path(output_json_path)
+    raw_folder = raw_folder_for(output_path)
+    if model is None:
+        model = utils.get_generative_model(model_name=DEFAULT_MODEL)
+
+    def section_prompt(note):
+        def build(uploaded_file_uri: str, **kwargs) -> list:
+            return prompt_builder(uploaded_file_uri, **kwargs) + [{'text': note}]
+        return build
+
+    start_time = time.time()
+    names = list(paper_sections.SECTIONS)
+    results = await asyncio.gather(*[
+        extract_paper(input_pdf_path, str(raw_folder / f"section_{name.lower()}" / output_path.name),
+                      section_prompt(paper_sections.SECTIONS[name]), logger, model=model, **options)
+        for name in names
+    ])
+    if any(r is None for r in results):
+        logger.error(f"{output_path.name}: a section could not be parsed (raw kept in {raw_folder}/section_*_raw)")
+        return None
+
+    data = paper_sections.merge_sections(dict(zip(names, results)))
+    counts = ", ".join(f"{name}: {len(r)}" for name, r in zip(names, results))
+    logger.info(f"Merged sections ({counts}) into {len(data)} questions in {time.time() - start_time:.2f}s")
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    utils.atomic_write_json(output_path, data)
+    return data
+
+
+async def process_single_paper(input_pdf: pathlib.Path, output_json: pathlib.Path, prompt_builder, logger,
+                               model, semaphore: asyncio.Semaphore, stream: bool = False,
+                               mirrored_fields: dict = None, compact: bool = False,
+                               generation_config: dict = None, shard_pages: int = 0,
+                               shard_overlap: int = page_shards.DEFAULT_OVERLAP, sections: bool = False) -> dict:
+    """
+    Process a single paper, recording the `extract` job in the job store, and return status.
+    With `shard_pages`, the paper is extracted in concurrent page windows (extract_sharded);
+    with `sections`, as concurrent Section A / Section B generations (extract_sections).
+    """
+    result = {
+        "input": input_pdf.name,
+        "output": output_json.name,
+        "status": "unknown",
+        "time": 0,
+        "error": None
+    }
+
+    jobs = job_store.get_job_store()
+    paper = job_store.paper_key(output_json)
+    usage = {}
+
+    async with semaphore:
+        print(f"🚀 Starting: {input_pdf.name}")
+        start = time.time()
+        jobs.start(paper, "extract")
+
+        try:
+            options = dict(stream=stream, usage=usage, mirrored_fields=mirrored_fields, compact=compact,
+                           generation_config=generation_config)
+            if shard_pages:
+                data = await extract_sharded(str(input_pdf), str(output_json), prompt_builder, logger, model=model,
+                                             pages=shard_pages, overlap=shard_overlap, **options)
+            elif sections:
+                data = await extract_sections(str(input_pdf), str(output_json), prompt_builder, logger, model=model,
+                                              **options)
+            else:
+                data = await extract_paper(str(input_pdf), str(output_json), prompt_builder, logger,
+                                           model=model, **options)
+            if data is None:
+                raise Exception("Failed to parse the model response (raw preserved)")
+            jobs.finish(paper, "extract", output_json, usage)
+            result["status"] = "success"
+            print(f"✅ Completed: {input_pdf.name}")
+        except Exception as e:
+            jobs.fail(paper, "extract", e, usage)
+            result["status"] = "error"
+            result["error"] = str(e)
+            print(f"❌ Failed: {input_pdf.name} - {e}")
+
+        result["time"] = time.time() - start
+        print(f"⏱️  Time for {input_pdf.name}: {result['time']:.2f}s ({result['time']/60:.2f}min)")
+
+    return result
+
+
+# --- Annotation ---
+
+async def annotate_paper(input_json_path: str, output_json_path: str, prompt_builder, chapters: list, logger,
+                         model=None, usage: dict = None, classifier=None, cache=None, generation_config: dict = None):
+    """
+    Annotates one extracted paper with chapter numbers and names.
+
+    Questions already in the annotation cache (see annotation_cache.py) and questions
+    the local classifier is confident about are labelled without the model (see
+    chapter_classifier.py); the model answers with `{id: chapter number}` for the
+    rest (see annotation.py), and the chapter fields are merged into the extracted
+    questions here.
+
+    Args:
+        input_json_path: Extracted questions (`{subject}_data/*.json`).
+        output_json_path: Where the annotated array is written (`{subject}_data_annotated/*.json`).
+        prompt_builder: `prompt_builder(questions)` -> annotation prompt (see subjects.Subject.annotation_prompt).
+        chapters: The subject's chapter list; chapter numbers are 1-based indexes into it.
+        logger: Logger instance.
+        model: Optional shared GenerativeModel; created on demand otherwise.
+        usage: Optional dict that accumulates `prompt_tokens` / `output_tokens`.
+        classifier: Optional chapter_classifier.ChapterClassifier for the subject.
+        cache: Optional annotation_cache.SubjectCache; Gemini's answers are stored in it.
+        generation_config: Structured output (response_schemas.annotation_config): the model
+            answers with `[{"id", "chapter"}]`, parsed with one json.loads.
+
+    Questions the model leaves without a valid chapter are asked for again, up to
+    ANNOTATION_ROUNDS calls in all.
+
+    Returns:
+        The annotated list of questions, or None if the response could not be parsed
+        (the raw response is preserved in `{subject}_data_annotated_raw/`).
+
+    Raises:
+        Exception: If the input cannot be read, the API call fails after retries, or some
+            questions still have no valid chapter (nothing is written then).
+    """
+    input_path = pathlib.Path(input_json_path)
+    output_path = pathlib.Path(output_json_path)
+    raw_folder = raw_folder_for(output_path)
+    raw_folder.mkdir(exist_ok=True, parents=True)
+
+    try:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to read input file {input_path.name}: {e}")
+        raise
+
+    chapter_map = cache.lookup(questions) if cache is not None else {}
+    uncertain = [q for q in questions if not (isinstance(q, dict) and str(q.get("id")) in chapter_map)]
+    if chapter_map:
+        logger.info(f"{input_path.name}: {len(chapter_map)}/{len(questions)} questions found in the annotation cache")
+
+    local_map = {}
+    if classifier is not None:
+        local_map, uncertain = classifier.classify(uncertain)
+        chapter_map.update(local_map)
+    local_path = chapter_classifier.local_labels_path(raw_folder, input_path.stem)
+    if local_map:
+        utils.atomic_write_json(local_path, sorted(local_map))
+        logger.info(f"{input_path.name}: {len(local_map)}/{len(questions)} questions labelled locally")
+    else:
+        local_path.unlink(missing_ok=True)
+
+    if uncertain and model is None:
+        model = utils.get_generative_model(model_name=DEFAULT_MODEL)
+
+    # The first round asks for every uncertain question, the next ones only for the ids left without a valid chapter
+    for attempt in range(ANNOTATION_ROUNDS):
+        if not uncertain:
+            break
+        response = await utils.generate_content_with_retry_async(model, prompt_builder(uncertain), logger=logger,
+                                                                 generation_config=generation_config)
+        if not response:
+            logger.error(f"Failed to process {input_path.name}.")
+            raise Exception("API call failed after retries")
+        utils.add_usage(usage, response)
+
+        # Save raw response IMMEDIATELY
+        suffix = "_raw.txt" if attempt == 0 else f"_raw_retry{attempt}.txt"
+        raw_path = raw_folder / f"{input_path.stem}{suffix}"
+        utils.atomic_write_text(raw_path, response.text)
+
+        try:
+            if generation_config:
+                model_map = response_schemas.loads(response.text, logger)
+            else:
+                model_map = json_repair.loads(response.text)
+            if isinstance(model_map, list):
+                # Structured `[{"id", "chapter"}]`, or the questions echoed back with chapters inserted
+                model_map = annotation.chapter_map_from_annotated(model_map)
+            if not isinstance(model_map, dict):
+                raise ValueError(f"expected an id -> chapter object, got {type(model_map).__name__}")
+        except Exception as e:
+            logger.error(f"Failed to parse Gemini's response for {input_path.name}: {e}")
+            return None
+        # Only the questions that were asked; the rest keep their cached or local chapter
+        asked = {str(q.get("id")) for q in uncertain if isinstance(q, dict)}
+        chapter_map.update({qid: c for qid, c in model_map.items() if str(qid) in asked})
+        if cache is not None:
+            cache.store(uncertain, model_map)
+
+        _, missing = annotation.apply_chapters(uncertain, chapter_map, chapters)
+        missing = set(map(str, missing))
+        uncertain = [q for q in uncertain if isinstance(q, dict) and str(q.get("id")) in missing]
+        if uncertain and attempt + 1 < ANNOTATION_ROUNDS:
+            logger.warning(f"{input_path.name}: no valid chapter for {len(uncertain)} questions; asking again")
+
+    annotated, missing = annotation.apply_chapters(questions, chapter_map, chapters)
+    if missing:
+        # Not written: a partially annotated paper must stay pending so the next run retries it
+        raise ValueError(f"no valid chapter for {len(missing)} questions: {', '.join(map(str, missing))}")
+
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    utils.atomic_write_json(output_path, annotated)
+    return annotated
+
+
+async def process_single_annotation(input_json: pathlib.Path, output_json: pathlib.Path, prompt_builder,
+                                    chapters: list, logger, model, semaphore: asyncio.Semaphore,
+                                    classifier=None, cache=None, generation_config: dict = None) -> dict:
+    """Annotate a single paper, recording the `annotate` job in the job store, and return status."""
+    result = {
+        "input": input_json.name,
+        "output": output_json.name,
+        "status": "unknown",
+        "time": 0,
+        "error": None
+    }
+
+    jobs = job_store.get_job_store()
+    paper = job_store.paper_key(output_json)
+    usage = {}
+
+    async with semaphore:
+        print(f"🚀 Processing: {input_json.name}")
+        start = time.time()
+        jobs.start(paper, "annotate")
+
+        try:
+            data = await annotate_paper(str(input_json), str(output_json), prompt_builder, chapters, logger,
+                                        model=model, usage=usage, classifier=classifier, cache=cache,
+                                        generation_config=generation_config)
+            if data is None:
+                raise Exception("Failed to parse the model response (raw preserved)")
+            jobs.finish(paper, "annotate", output_json, usage)
+            result["status"] = "success"
+            print(f"✓ Annotated data saved to: {output_json}")
+        except Exception as e:
+            jobs.fail(paper, "annotate", e, usage)
+            result["status"] = "error"
+            result["error"] = str(e)
+            print(f"❌ Failed: {input_json.name} - {e}")
+
+        result["time"] = time.time() - start
+
+    return result
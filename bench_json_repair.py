@@ -0,0 +1,101 @@
+"""
+Benchmark: legacy regex `clean_json_response` vs the single-pass `json_repair` engine.
+
+Runs both over every `*_data_raw/*_raw.txt` and `*_data_annotated_raw/*_raw.txt`
+response on disk and reports end-to-end (repair + parse) throughput, how many files
+parse, and how many parsed files contain control characters that only appear because
+a LaTeX escape such as `\\frac` or `\\beta` was decoded as a form feed / backspace.
+The `tokenizer` row forces every file through the repair tokenizer (no fast path).
+
+Usage:
+    python bench_json_repair.py [rounds]
+"""
+import glob
+import json
+import re
+import sys
+import time
+import json_repair
+
+
+def legacy_clean_json_response(raw_text: str) -> str:
+    """The regex-based repair utils.clean_json_response used before json_repair.py."""
+    match = re.search(r'```json\s*([\s\S]*?)\s*```', raw_text, re.DOTALL)
+    if match:
+        text = match.group(1).strip()
+    else:
+        text = raw_text.strip()
+    text = text.replace('\\\\', '\\')
+    text = re.sub(r'\\(?![\\\"/bfnrtu])', r'\\\\', text)
+    text = re.sub(r',\s*}', '}', text)
+    text = re.sub(r',\s*]', ']', text)
+    text = re.sub(r'}\s*{', '}, {', text)
+    text = re.sub(r']\s*\[', '], [', text)
+    if not (text.startswith('[') or text.startswith('{')):
+        start_array = text.find('[')
+        start_obj = text.find('{')
+        if start_array != -1 and (start_obj == -1 or start_array < start_obj):
+            start = start_array
+            end = text.rfind(']')
+        elif start_obj != -1:
+            start = start_obj
+            end = text.rfind('}')
+        else:
+            start = -1
+        if start != -1 and end != -1 and end > start:
+            text = text[start:end+1]
+    return text
+
+
+def has_corrupted_escape(value) -> bool:
+    """True if any string in `value` contains a backspace/form feed (a decoded `\\b...`/`\\f...` LaTeX command)."""
+    if isinstance(value, str):
+        return "\b" in value or "\f" in value
+    if isinstance(value, dict):
+        return any(has_corrupted_escape(v) for v in value.values())
+    if isinstance(value, list):
+        return any(has_corrupted_escape(v) for v in value)
+    return False
+
+
+def run(name, parse, texts, rounds):
+    parsed = corrupted = 0
+    for text in texts:
+        try:
+            data = parse(text)
+        except json.JSONDecodeError:
+            continue
+        parsed += 1
+        corrupted += has_corrupted_escape(data)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            try:
+                parse(text)
+            except json.JSONDecodeError:
+                pass
+    elapsed = (time.perf_counter() - start) / rounds
+    total_mb = sum(len(t.encode("utf-8")) for t in texts) / 2**20
+    print(f"{name:<10} {parsed:>4}/{len(texts):<4} parsed   {corrupted:>3} with corrupted LaTeX   "
+          f"{elapsed * 1000:8.1f} ms   {total_mb / elapsed:6.1f} MB/s")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    paths = sorted(glob.glob("*_data_raw/*_raw.txt") + glob.glob("*_data_annotated_raw/*_raw.txt"))
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if text.strip():
+            texts.append(text)
+
+    print(f"📊 {len(texts)} non-empty raw responses ({len(paths) - len(texts)} empty skipped), {rounds} rounds\n")
+    run("legacy", lambda t: json.loads(legacy_clean_json_response(t)), texts, rounds)
+    run("loads", json_repair.loads, texts, rounds)
+    run("tokenizer", lambda t: json.loads(json_repair.repair_json(t)), texts, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Incremental rebuild of the merge and split stages.
+
+The README flowchart as a dependency graph, per subject:
+
+    {subject}_data_annotated/{prefix}_*.json --merge--> {subject}_pro/{subject}_all_years.json
+    {subject}_all_years.json --materialize--> {subject}_pro_chapters/, {subject}_pro_types/,
+                                              {subject}_pro_type_chapters/
+    {subject}_all_years.json --related--> {subject}_pro/{subject}_related.bin, {subject}_related_keys.json
+    {subject}_all_years.json --search--> {subject}_pro/{subject}_search.bin
+    {subject}_data/{prefix}_*.json --repeated--> {subject}_pro/{subject}_repeated.json
+
+Each step records the SHA-256 of every input and output it saw in
+`.pipeline/build_state.json`. On a re-run a step is skipped unless an input hash
+changed or an output went missing or was edited. Outputs are only rewritten when
+their content changes (corpus.write_json), so a changed annotated paper
+re-runs the merge, but the views only rewrite the chapter and type files that
+actually contain it. File hashes are cached by (mtime, size), so an up-to-date
+check does not re-read anything.
+
+Usage:
+    python build_graph.py                    # all subjects
+    python build_graph.py hindi sanskrit
+    python build_graph.py --force science    # rebuild regardless of hashes
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pathlib
+import corpus
+import dedup_index
+import materialize
+import related_questions
+import search_index
+import subjects
+
+DEFAULT_STATE = ".pipeline/build_state.json"
+
+
+class BuildState:
+    """Recorded input/output hashes per step, plus a (mtime, size) -> sha256 cache per file."""
+
+    def __init__(self, path: str = DEFAULT_STATE):
+        self.path = pathlib.Path(path)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.steps = state.get("steps", {})
+        self.files = state.get("files", {})
+
+    def file_hash(self, path: str):
+        """SHA-256 of the file, or None if it does not exist."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self.files.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self.files[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def hashes(self, paths) -> dict:
+        return {p: self.file_hash(p) for p in sorted(paths)}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"steps": self.steps, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+class Step:
+    def __init__(self, name: str, stage: str, inputs, outputs, run):
+        self.name = name        # e.g. "science:merge"
+        self.stage = stage      # orchestrator stage it belongs to ("merge" or "split")
+        self.inputs = inputs    # () -> list of input paths
+        self.outputs = outputs  # () -> list of output paths
+        self.run = run          # (context) -> None
+
+    def up_to_date(self, state: BuildState) -> bool:
+        recorded = state.steps.get(self.name)
+        if not recorded:
+            return False
+        if recorded["inputs"] != state.hashes(self.inputs()):
+            return False
+        outputs = recorded["outputs"]
+        return bool(outputs) and all(state.file_hash(p) == h for p, h in outputs.items())
+
+    def record(self, state: BuildState):
+        state.steps[self.name] = {
+            "inputs": state.hashes(self.inputs()),
+            "outputs": state.hashes(self.outputs()),
+        }
+
+
+def _json_files(directory: pathlib.Path, pattern: str = "*.json") -> list:
+    return glob.glob(os.path.join(str(directory), pattern))
+
+
+def subject_steps(subject) -> list:
+    """The subject's steps in dependency order. Steps share a context dict to hand data over in memory."""
+
+    def merge(ctx):
+        ctx["data"] = corpus.merge(subject)
+
+    def views(ctx):
+        materialize.materialize(subject, ctx.get("data"))
+
+    def related(ctx):
+        related_questions.write_related(subject, ctx.get("data"))
+
+    def search(ctx):
+        search_index.write_index(subject, ctx.get("data"))
+
+    def repeated(ctx):
+        dedup_index.write_repeated(subject)
+
+    def view_files():
+        return (_json_files(subject.chapters_dir) + _json_files(subject.types_dir)
+                + glob.glob(os.path.join(str(subject.type_chapters_dir), "**", "*.json"), recursive=True))
+
+    merged = str(subject.merged_path)
+    return [
+        Step(f"{subject.name}:merge", "merge",
+             lambda: _json_files(subject.annotated_dir, f"{subject.prefix}_*.json"),
+             lambda: [merged], merge),
+        Step(f"{subject.name}:materialize", "split", lambda: [merged], view_files, views),
+        Step(f"{subject.name}:related", "split", lambda: [merged],
+             lambda: [str(subject.related_path), str(subject.related_keys_path)], related),
+        Step(f"{subject.name}:search", "split", lambda: [merged], lambda: [str(subject.search_index_path)], search),
+        Step(f"{subject.name}:repeated", "split",
+             lambda: _json_files(subject.data_dir, f"{subject.prefix}_*.json"),
+             lambda: [str(subject.repeated_path)], repeated),
+    ]
+
+
+def build_subject(subject, stages=("merge", "split"), force: bool = False, state: BuildState = None) -> int:
+    """Runs the subject's out-of-date steps in `stages`. Returns how many steps ran."""
+    own_state = state is None
+    state = state or BuildState(os.environ.get("PIPELINE_BUILD_STATE", DEFAULT_STATE))
+    ctx = {}
+    ran = 0
+    for step in subject_steps(subject):
+        if step.stage not in stages:
+            continue
+        if not force and step.up_to_date(state):
+            print(f"✔ {step.name} up to date")
+            continue
+        step.run(ctx)
+        step.record(state)
+        ran += 1
+    if own_state:
+        state.save()
+    return ran
+
+
+def build(subject_names=subjects.NAMES, stages=("merge", "split"), force: bool = False) -> int:
+    state = BuildState(os.environ.get("PIPELINE_BUILD_STATE", DEFAULT_STATE))
+    try:
+        return sum(build_subject(subjects.get(name), stages, force, state) for name in subject_names)
+    finally:
+        state.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild merged and split views whose inputs changed.")
+    parser.add_argument("subjects", nargs="*", help=f"Subjects to rebuild (default: {' '.join(subjects.NAMES)})")
+    parser.add_argument("--force", action="store_true", help="Rebuild every step regardless of hashes")
+    args = parser.parse_args()
+
+    for name in args.subjects:
+        if name not in subjects.SUBJECTS:
+            parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+    ran = build(args.subjects or subjects.NAMES, force=args.force)
+    print(f"\n🔁 {ran} steps rebuilt")
+
+
+if __name__ == "__main__":
+    main()
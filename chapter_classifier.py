@@ -0,0 +1,241 @@
+"""
+Local first-pass chapter classifier.
+
+Every annotated paper in `{subject}_data_annotated/` is training data: each question
+has a chapter Gemini picked. A new paper mostly reuses the same topics, so before
+annotating, each question is scored against per-chapter TF-IDF centroids built from
+those questions (plus the chapter names). Questions whose best chapter wins by a clear
+margin are labelled locally; only the rest are sent to Gemini, and a paper whose
+questions are all confident needs no API call at all.
+
+Locally labelled ids are written to `{subject}_data_annotated_raw/{stem}_local.json`
+and left out of training, so the classifier only ever learns from Gemini's answers.
+
+Vectors are sparse `{term: weight}` dicts: NumPy is not a dependency of the
+pipeline, and a few thousand short questions train in well under a second.
+
+Usage:
+    python chapter_classifier.py                        # leave-one-paper-out report, all subjects
+    python chapter_classifier.py science --margin 0.15
+"""
+import argparse
+import json
+import math
+import pathlib
+import re
+from collections import Counter
+import annotation
+import subjects
+
+MIN_SCORE = 0.2     # cosine similarity to the best chapter centroid
+MIN_MARGIN = 0.1    # lead of the best chapter over the runner-up
+MIN_EXAMPLES = 5    # annotated questions a chapter needs before it is predicted locally
+
+# Fields that carry no topic signal (or the label itself)
+_SKIPPED_FIELDS = {"id", "type", "chapter", "chapter_name", "answer", "answers", "uttar", "marks", "instructions"}
+_TOKEN = re.compile("[a-z0-9]+|[\u0900-\u0963\u0966-\u097f]+")  # Devanagari words without the dandas
+_STOPWORDS = {
+    "the", "of", "and", "to", "in", "is", "a", "an", "what", "which", "are", "for", "with", "on",
+    "by", "its", "it", "be", "as", "at", "or", "from", "this", "that", "these", "those", "how",
+    "why", "give", "write", "explain", "following", "any", "two", "one", "three", "your", "their",
+    "do", "does", "was", "were", "has", "have", "can", "will", "also", "between", "example", "examples",
+    "का", "की", "के", "में", "है", "हैं", "और", "से", "को", "पर", "एक", "क्या", "लिखिए", "कीजिए", "कि",
+}
+
+_cache = {}
+
+
+def tokens(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS and (len(t) > 1 or not t.isascii())]
+
+
+def question_text(question: dict) -> str:
+    """Every string in the question except ids, answers and labels (options and sub-questions included)."""
+    parts = []
+
+    def collect(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for v in value.values():
+                collect(v)
+        elif isinstance(value, list):
+            for v in value:
+                collect(v)
+
+    for key, value in question.items():
+        if key not in _SKIPPED_FIELDS:
+            collect(value)
+    return " ".join(parts)
+
+
+def term_counts(text: str) -> Counter:
+    """Unigrams and adjacent-word bigrams."""
+    words = tokens(text)
+    counts = Counter(words)
+    counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return counts
+
+
+def _normalize(vector: dict) -> dict:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {t: w / norm for t, w in vector.items()} if norm else {}
+
+
+class ChapterClassifier:
+    """Nearest-centroid TF-IDF classifier over one subject's chapter list (chapters are 1-based)."""
+
+    def __init__(self, chapters: list, min_score: float = MIN_SCORE, min_margin: float = MIN_MARGIN):
+        self.chapters = chapters
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.idf = {}
+        self.postings = {}   # term -> [(chapter, centroid weight)]
+        self.examples = Counter()
+
+    def fit(self, examples: list) -> "ChapterClassifier":
+        """`examples` is `[(question dict, chapter number)]`; chapter names count as one example each."""
+        docs = [(term_counts(name), n) for n, name in enumerate(self.chapters, start=1)]
+        for question, chapter in examples:
+            if 1 <= chapter <= len(self.chapters):
+                docs.append((term_counts(question_text(question)), chapter))
+                self.examples[chapter] += 1
+
+        df = Counter()
+        for counts, _ in docs:
+            df.update(counts.keys())
+        self.idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+
+        sums = {}
+        for counts, chapter in docs:
+            centroid = sums.setdefault(chapter, Counter())
+            for t, w in self._weigh(counts).items():
+                centroid[t] += w
+
+        self.postings = {}
+        for chapter, centroid in sums.items():
+            for t, w in _normalize(centroid).items():
+                self.postings.setdefault(t, []).append((chapter, w))
+        return self
+
+    def _weigh(self, counts: Counter) -> dict:
+        return _normalize({t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items() if t in self.idf})
+
+    def scores(self, question: dict) -> Counter:
+        """Cosine similarity of the question to every chapter centroid it shares a term with."""
+        scores = Counter()
+        for t, w in self._weigh(term_counts(question_text(question))).items():
+            for chapter, cw in self.postings[t]:
+                scores[chapter] += w * cw
+        return scores
+
+    def predict(self, question: dict):
+        """`(chapter, score, margin)`; chapter is None unless the prediction is confident."""
+        ranked = self.scores(question).most_common(2) + [(None, 0.0), (None, 0.0)]
+        (best, score), (_, runner_up) = ranked[0], ranked[1]
+        margin = score - runner_up
+        if best is None or self.examples[best] < MIN_EXAMPLES or score < self.min_score or margin < self.min_margin:
+            return None, score, margin
+        return best, score, margin
+
+    def classify(self, questions: list):
+        """
+        Returns:
+            (`{id: chapter}` for the confident questions, the questions left for Gemini)
+        """
+        chapter_map = {}
+        uncertain = []
+        for q in questions:
+            chapter = None
+            if isinstance(q, dict) and "id" in q:
+                chapter, _, _ = self.predict(q)
+            if chapter is None:
+                uncertain.append(q)
+            else:
+                chapter_map[str(q["id"])] = chapter
+        return chapter_map, uncertain
+
+
+def local_labels_path(raw_folder: pathlib.Path, stem: str) -> pathlib.Path:
+    """Where the ids labelled locally for a paper are recorded."""
+    return raw_folder / f"{stem}_local.json"
+
+
+def local_ids(subject, stem: str) -> set:
+    """Ids of the paper that were labelled locally rather than by Gemini."""
+    path = local_labels_path(subject.annotated_raw_dir, stem)
+    if not path.exists():
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def labelled_questions(path: pathlib.Path, skip_ids=()) -> list:
+    """`[(question, chapter number)]` of one annotated paper."""
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    if not isinstance(questions, list):
+        return []
+    chapter_map = annotation.chapter_map_from_annotated(questions)
+    return [(q, chapter_map[str(q["id"])]) for q in questions
+            if isinstance(q, dict) and str(q.get("id")) in chapter_map and str(q.get("id")) not in skip_ids]
+
+
+def training_examples(subject, exclude_stem: str = None) -> list:
+    """`[(question, chapter number)]` from the subject's annotated papers, skipping locally labelled ids."""
+    examples = []
+    for path in sorted(subject.annotated_dir.glob(f"{subject.prefix}_*.json")):
+        if path.stem == exclude_stem:
+            continue
+        try:
+            examples.extend(labelled_questions(path, local_ids(subject, path.stem)))
+        except (OSError, ValueError):
+            continue
+    return examples
+
+
+def for_subject(subject) -> ChapterClassifier:
+    """The subject's classifier, trained once per process."""
+    if subject.name not in _cache:
+        _cache[subject.name] = ChapterClassifier(subject.chapters).fit(training_examples(subject))
+    return _cache[subject.name]
+
+
+def evaluate(subject, min_score: float = MIN_SCORE, min_margin: float = MIN_MARGIN) -> dict:
+    """Leave-one-paper-out: each annotated paper is classified by a model trained on the others."""
+    papers = sorted(subject.annotated_dir.glob(f"{subject.prefix}_*.json"))
+    total = confident = correct = 0
+    for path in papers:
+        classifier = ChapterClassifier(subject.chapters, min_score, min_margin).fit(
+            training_examples(subject, exclude_stem=path.stem))
+        for question, chapter in labelled_questions(path, local_ids(subject, path.stem)):
+            total += 1
+            predicted, _, _ = classifier.predict(question)
+            if predicted is not None:
+                confident += 1
+                correct += predicted == chapter
+    return {"papers": len(papers), "questions": total, "confident": confident, "correct": correct}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leave-one-paper-out accuracy of the local chapter classifier.")
+    parser.add_argument("subjects", nargs="*", help=f"Subjects to evaluate (default: {' '.join(subjects.NAMES)})")
+    parser.add_argument("--score", type=float, default=MIN_SCORE, help="Minimum similarity to the best chapter")
+    parser.add_argument("--margin", type=float, default=MIN_MARGIN, help="Minimum lead over the runner-up")
+    args = parser.parse_args()
+
+    for name in args.subjects:
+        if name not in subjects.SUBJECTS:
+            parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+    for name in args.subjects or subjects.NAMES:
+        r = evaluate(subjects.get(name), args.score, args.margin)
+        if not r["questions"]:
+            print(f"{name}: no annotated papers yet")
+            continue
+        accuracy = r["correct"] / r["confident"] if r["confident"] else 0.0
+        print(f"{name}: {r['confident']}/{r['questions']} labelled locally "
+              f"({r['confident'] / r['questions']:.0%}) across {r['papers']} papers, {accuracy:.1%} agree with Gemini")
+
+
+if __name__ == "__main__":
+    main()
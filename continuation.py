@@ -0,0 +1,115 @@
+"""
+Salvage and continuation for truncated extraction output.
+
+When a long paper hits the output token limit (or a stream breaks off), the response
+ends in the middle of a question and the whole-array parse fails. Instead of throwing
+the paper away:
+
+1. `salvage_questions` keeps every question object that was completed;
+2. `continue_extraction` asks the model, against the same uploaded PDF, for only the
+   questions after the last complete id ("continue from short_7") and stitches the
+   answers on, repeating until the array closes or MAX_CONTINUATIONS is reached.
+"""
+import pathlib
+import json_repair
+import upload_registry
+import utils
+from stream_parser import IncrementalQuestionParser
+
+MAX_CONTINUATIONS = 3
+
+
+def salvage_questions(text: str):
+    """
+    Parses `text` up to the last complete question object.
+
+    Returns:
+        (questions, complete) - `complete` is True if the top-level array was closed
+        and every object in it parsed.
+    """
+    parser = IncrementalQuestionParser()
+    parser.feed(text)
+    return parser.questions, parser.closed and not parser.failed
+
+
+def hit_token_limit(response) -> bool:
+    """True if the model stopped because it ran out of output tokens."""
+    for candidate in getattr(response, "candidates", None) or []:
+        reason = getattr(candidate, "finish_reason", None)
+        if getattr(reason, "name", reason) in ("MAX_TOKENS", 2):
+            return True
+    return False
+
+
+def build_continuation_prompt(prompt_parts: list, questions: list) -> list:
+    """Appends a "continue after <last id>" instruction to the original extraction prompt."""
+    done_ids = [q.get("id") for q in questions if isinstance(q, dict) and q.get("id")]
+    last_id = done_ids[-1] if done_ids else None
+    instruction = (
+        "\n\nIMPORTANT - CONTINUATION REQUEST: your previous answer was cut off at the output limit.\n"
+        f"These questions were already extracted (ids): {', '.join(done_ids)}.\n"
+        f"Continue from the question that comes right after \"{last_id}\" in the paper and extract "
+        "every remaining question until the end of the paper. Use exactly the same JSON schema and "
+        "id numbering as before, do not repeat any question listed above, and output only a JSON "
+        "array of the remaining questions."
+    )
+    return prompt_parts + [{'text': instruction}]
+
+
+def stitch(questions: list, more: list) -> list:
+    """Appends `more` to `questions`, skipping ids that were already extracted."""
+    seen = {q.get("id") for q in questions if isinstance(q, dict)}
+    stitched = list(questions)
+    for q in more:
+        qid = q.get("id") if isinstance(q, dict) else None
+        if qid is not None and qid in seen:
+            continue
+        seen.add(qid)
+        stitched.append(q)
+    return stitched
+
+
+async def continue_extraction(model, input_path: pathlib.Path, prompt_builder, questions: list,
+                              raw_path: pathlib.Path, logger, usage: dict = None, generation_config=None) -> list:
+    """
+    Requests the questions after the last salvaged one until the paper is complete.
+
+    Each continuation's raw response is kept next to the original as
+    `{stem}_raw.cont{n}.txt`.
+
+    Returns:
+        The stitched list of questions (possibly still incomplete if continuations ran out).
+    """
+    uploaded_file = await upload_registry.get_or_upload_async(input_path, logger)
+    for n in range(1, MAX_CONTINUATIONS + 1):
+        last_id = questions[-1].get("id") if questions and isinstance(questions[-1], dict) else None
+        logger.info(f"✂️ Output truncated after {len(questions)} questions; continuing from {last_id} ({n}/{MAX_CONTINUATIONS})")
+
+        prompt_parts = build_continuation_prompt(prompt_builder(uploaded_file.uri), questions)
+        response = await utils.generate_content_with_retry_async(
+            model, prompt_parts, logger=logger, source_files=[input_path], generation_config=generation_config
+        )
+        if not response:
+            logger.error("Continuation request failed; keeping salvaged questions.")
+            break
+        utils.add_usage(usage, response)
+
+        cont_path = raw_path.with_name(f"{raw_path.stem}.cont{n}.txt")
+        utils.atomic_write_text(cont_path, response.text)
+
+        try:
+            more, complete = json_repair.loads(response.text), True
+        except ValueError:
+            more, complete = salvage_questions(response.text)
+        if not isinstance(more, list):
+            more, complete = [], True
+
+        before = len(questions)
+        questions = stitch(questions, more)
+        logger.info(f"➕ Continuation {n} added {len(questions) - before} questions")
+        if complete and not hit_token_limit(response):
+            break
+        if len(questions) == before:
+            logger.warning("Continuation added nothing new; stopping.")
+            break
+    return questions
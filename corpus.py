@@ -0,0 +1,168 @@
+"""
+Merge stage and the helpers shared with the materialized views, for every subject.
+
+`merge` is the logic of the merge_*.py scripts with the subject as a parameter:
+
+    {subject}_data_annotated/{prefix}_*.json -> {subject}_pro/{subject}_all_years.json
+
+The chapter / type views are built from its output by materialize.py.
+"""
+import os
+import json
+import glob
+import re
+from typing import List, Dict, Any
+
+TYPES = ["objective", "short", "long"]
+
+
+def read_items_from_file(file_path: str) -> List[Dict[str, Any]]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ("questions", "data", "items", "records"):
+            value = data.get(key)
+            if isinstance(value, list):
+                return value
+    return []
+
+
+def slugify(value: str) -> str:
+    """Convert string to URL-safe slug."""
+    value = value.strip().lower()
+    value = re.sub(r"[^a-z0-9\-\_\s]", "", value)
+    value = re.sub(r"[\s\-]+", "-", value)
+    return value or "unknown"
+
+
+def normalize_type(type_value: str) -> str:
+    """Normalize question type to standard names."""
+    if not type_value:
+        return "unknown"
+
+    type_lower = type_value.lower().strip()
+
+    # Map various possible type names to standard ones
+    if type_lower in ["objective", "mcq", "multiple choice", "multiple_choice"]:
+        return "objective"
+    elif type_lower in ["short", "short answer", "short_answer", "sa"]:
+        return "short"
+    elif type_lower in ["long", "long answer", "long_answer", "la", "descriptive"]:
+        return "long"
+    else:
+        return "unknown"
+
+
+def chapter_key_of(item: Dict[str, Any]) -> str:
+    # Prefer explicit chapter identifier, fallback to chapter_name
+    chapter_id = item.get("chapter")
+    if chapter_id is None or chapter_id == "":
+        chapter_id = item.get("chapter_name")
+    if chapter_id is None or chapter_id == "":
+        chapter_id = "unknown"
+    return str(chapter_id)
+
+
+def order_years(year_map: Dict[str, list]) -> Dict[str, list]:
+    """Order years numerically when possible."""
+    try:
+        ordered_years = sorted(year_map.keys(), key=lambda y: int(y))
+    except ValueError:
+        ordered_years = sorted(year_map.keys())
+    return {y: year_map[y] for y in ordered_years}
+
+
+def write_json(path: str, data) -> bool:
+    """Writes `data` (indent=2) unless the file already holds exactly that text. Returns True if it wrote."""
+    return write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def write_text(path: str, text: str) -> bool:
+    """Writes `text` unless the file already holds exactly that text. Returns True if it wrote."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False  # unchanged: keep the mtime so downstream hashes stay cached
+    except (OSError, UnicodeDecodeError):
+        pass
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_bytes(path: str, data: bytes) -> bool:
+    """`write_text` for binary sidecars."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def load_merged(subject) -> Dict[str, list]:
+    """Reads `{subject}_pro/{subject}_all_years.json`."""
+    with open(subject.merged_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("Expected top-level object keyed by year.")
+    return data
+
+
+# --- Stages ---
+
+def merge(subject) -> Dict[str, list]:
+    """`{subject}_data_annotated/{prefix}_*.json` -> `{subject}_pro/{subject}_all_years.json`, keyed by year."""
+    source_dir = str(subject.annotated_dir)
+    output_dir = str(subject.pro_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    input_files = sorted(glob.glob(os.path.join(source_dir, f"{subject.prefix}_*.json")))
+    grouped_by_year: Dict[str, List[Dict[str, Any]]] = {}
+    per_file_counts: Dict[str, int] = {}
+
+    for file_path in input_files:
+        try:
+            items = read_items_from_file(file_path)
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse {file_path}: {e}")
+            continue
+        except OSError as e:
+            print(f"Failed to read {file_path}: {e}")
+            continue
+
+        base = os.path.basename(file_path)
+        year = "".join(ch for ch in base if ch.isdigit())
+        # Fallback if we couldn't parse digits
+        if not year:
+            year = base
+        grouped_by_year.setdefault(year, []).extend(items)
+        per_file_counts[base] = len(items)
+
+    # Sort the years numerically when possible for stable output
+    def year_sort_key(k: str) -> Any:
+        try:
+            return int(k)
+        except ValueError:
+            return k
+
+    ordered_years = sorted(grouped_by_year.keys(), key=year_sort_key)
+    ordered_obj: Dict[str, List[Dict[str, Any]]] = {y: grouped_by_year[y] for y in ordered_years}
+
+    output_path = str(subject.merged_path)
+    write_json(output_path, ordered_obj)
+
+    total_items = sum(len(v) for v in grouped_by_year.values())
+    print(f"Wrote {output_path} with {total_items} items across {len(grouped_by_year)} years")
+    for name in sorted(per_file_counts):
+        print(f"{name}: {per_file_counts[name]}")
+    return ordered_obj
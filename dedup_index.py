@@ -0,0 +1,202 @@
+"""
+Near-duplicate question index (MinHash + LSH).
+
+Clusters near-identical questions across every paper of a subject: the same
+question reworded slightly, renumbered, with punctuation or Unicode spelling
+differences, or with its options reordered. Comparing every pair is quadratic in
+the number of questions; instead each question gets a MinHash signature of its
+word-bigram shingles (after textnorm.normalize), the signature is cut into bands,
+and only questions sharing a band bucket are compared. Candidates are confirmed
+by the exact Jaccard similarity of their shingle sets and merged with union-find.
+
+Each subject's clusters are written, most repeated first, to
+
+    {subject}_pro/{subject}_repeated.json
+
+Usage:
+    python dedup_index.py                       # all subjects
+    python dedup_index.py hindi --threshold 0.7
+"""
+import argparse
+import hashlib
+import random
+import corpus
+import subjects
+import textnorm
+
+NUM_PERM = 64
+BANDS = 16             # 16 bands of 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+THRESHOLD = 0.8        # Jaccard similarity of the shingle sets to count as the same question
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _strings(value) -> list:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [s for v in value for s in _strings(v)]
+    return []
+
+
+def question_text(question: dict) -> str:
+    """
+    `question` (or `prashna`) with its passage and sub-questions, so that "Answer the
+    following:" stems only match when their parts do, plus the options sorted so their
+    order does not matter.
+    """
+    parts = _strings(question.get("question") or question.get("prashna"))
+    parts += _strings(question.get("context")) + _strings(question.get("sub_questions") or question.get("anuprashna"))
+    parts += sorted(_strings(question.get("options") or question.get("vikalpa")))
+    return " ".join(parts)
+
+
+def shingles(text: str) -> set:
+    """Word bigrams of the normalized text (the words themselves for one-word texts)."""
+    words = textnorm.tokens(text)
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        a, b = self.find(i), self.find(j)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class DedupIndex:
+    """Add `(key, text)` pairs, then read the clusters of near-identical texts."""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, threshold: float = THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self.perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.keys = []
+        self.shingle_sets = []
+        self.buckets = {}   # (band, band values) -> [item index]
+
+    def signature(self, shingle_set: set) -> list:
+        hashes = [_shingle_hash(s) for s in shingle_set]
+        return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in self.perms]
+
+    def add(self, key, text: str) -> bool:
+        """Indexes one text. Returns False if it has no words."""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return False
+        index = len(self.keys)
+        self.keys.append(key)
+        self.shingle_sets.append(shingle_set)
+        signature = self.signature(shingle_set)
+        for band, start in enumerate(range(0, len(signature), self.rows)):
+            self.buckets.setdefault((band, tuple(signature[start:start + self.rows])), []).append(index)
+        return True
+
+    def similarity(self, i: int, j: int) -> float:
+        a, b = self.shingle_sets[i], self.shingle_sets[j]
+        return len(a & b) / len(a | b)
+
+    def clusters(self) -> list:
+        """Lists of keys with at least two members, largest first, each in insertion order."""
+        uf = UnionFind(len(self.keys))
+        checked = set()
+        for members in self.buckets.values():
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    if (i, j) in checked or uf.find(i) == uf.find(j):
+                        continue
+                    checked.add((i, j))
+                    if self.similarity(i, j) >= self.threshold:
+                        uf.union(i, j)
+
+        groups = {}
+        for i in range(len(self.keys)):
+            groups.setdefault(uf.find(i), []).append(i)
+        clusters = [[self.keys[i] for i in members] for members in groups.values() if len(members) > 1]
+        clusters.sort(key=len, reverse=True)
+        return clusters
+
+
+def subject_questions(subject):
+    """`((paper stem, id), question)` for every extracted question of the subject, oldest paper first."""
+    for path in sorted(subject.data_dir.glob(f"{subject.prefix}_*.json")):
+        try:
+            questions = corpus.read_items_from_file(str(path))
+        except (OSError, ValueError) as e:
+            print(f"Failed to read {path}: {e}")
+            continue
+        for q in questions:
+            if isinstance(q, dict) and "id" in q:
+                yield (path.stem, str(q["id"])), q
+
+
+def repeated_questions(subject, threshold: float = THRESHOLD) -> list:
+    """The subject's clusters of near-identical questions, most repeated first."""
+    index = DedupIndex(threshold=threshold)
+    by_key = {}
+    for key, question in subject_questions(subject):
+        if index.add(key, question_text(question)):
+            by_key[key] = question
+
+    view = []
+    for members in index.clusters():
+        papers = sorted({paper for paper, _ in members})
+        years = sorted({"".join(ch for ch in paper if ch.isdigit()) for paper in papers})
+        first = by_key[members[0]]
+        view.append({
+            "count": len(members),
+            "years": years,
+            "type": corpus.normalize_type(first.get("type", "")),
+            "question": first.get("question") or first.get("prashna"),
+            "members": [{"paper": paper, "id": qid} for paper, qid in members],
+        })
+    view.sort(key=lambda c: (-len(c["years"]), -c["count"]))
+    return view
+
+
+def write_repeated(subject, threshold: float = THRESHOLD) -> list:
+    """Writes `{subject}_pro/{subject}_repeated.json`. Returns the clusters."""
+    view = repeated_questions(subject, threshold)
+    subject.pro_dir.mkdir(exist_ok=True)
+    corpus.write_json(str(subject.repeated_path), view)
+    repeated = sum(c["count"] for c in view)
+    print(f"Wrote {subject.repeated_path}: {len(view)} repeated questions covering {repeated} occurrences")
+    return view
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-identical questions across years.")
+    parser.add_argument("subjects", nargs="*", help=f"Subjects to index (default: {' '.join(subjects.NAMES)})")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Jaccard similarity of word bigrams to count as the same question")
+    args = parser.parse_args()
+
+    for name in args.subjects:
+        if name not in subjects.SUBJECTS:
+            parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+    for name in args.subjects or subjects.NAMES:
+        write_repeated(subjects.get(name), args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+SQLite export of the annotated corpus with full-text search.
+
+Loads every annotated paper (the merge inputs, which still know their shift) into
+one database:
+
+    papers     paper, subject, year, shift, sha256 of the source file
+    questions  subject, paper, year, shift, id, position, type, chapter, chapter_name,
+               question, prashna, options, vikalpa, sub_questions, context, data (full JSON)
+    questions_fts  FTS5 over question / prashna / options / vikalpa
+
+SQLite's unicode61 tokenizer splits Devanagari words at every vowel sign, so the
+FTS columns hold textnorm-normalized text and the tokenizer is told that the
+Devanagari combining signs are part of a word; queries go through the same
+normalization. Only papers whose file changed since the last export are reloaded.
+
+Usage:
+    python export_sqlite.py                          # export all subjects to pyqs.sqlite3
+    python export_sqlite.py hindi sanskrit
+    python export_sqlite.py --search "ohm's law" --subject science
+    python export_sqlite.py --search "प्रकाश संश्लेषण"
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+import corpus
+import subjects
+import textnorm
+
+DEFAULT_DB = "pyqs.sqlite3"
+
+# Vowel signs, virama, anusvara, visarga (Mn/Mc) that unicode61 would treat as separators
+_DEVANAGARI_SIGNS = "".join(chr(c) for c in range(0x0900, 0x0980) if unicodedata.category(chr(c)).startswith("M"))
+_PAPER = re.compile(r"_(\d{4})(i+)$")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS papers (
+    paper TEXT PRIMARY KEY, subject TEXT NOT NULL, year INTEGER, shift TEXT, sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    rowid INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL, paper TEXT NOT NULL, year INTEGER, shift TEXT,
+    id TEXT, position INTEGER, type TEXT, chapter TEXT, chapter_name TEXT,
+    question TEXT, prashna TEXT, options TEXT, vikalpa TEXT, sub_questions TEXT, context TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_paper ON questions (paper);
+CREATE INDEX IF NOT EXISTS questions_subject_chapter ON questions (subject, chapter);
+CREATE INDEX IF NOT EXISTS questions_subject_type ON questions (subject, type);
+CREATE INDEX IF NOT EXISTS questions_subject_year ON questions (subject, year, shift);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, prashna, options, vikalpa,
+    tokenize = "unicode61 remove_diacritics 0 tokenchars '{_DEVANAGARI_SIGNS}'"
+);
+"""
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    db = sqlite3.connect(path or os.environ.get("PYQS_DB", DEFAULT_DB))
+    db.executescript(SCHEMA)
+    return db
+
+
+def _json_or_none(value):
+    return json.dumps(value, ensure_ascii=False) if value not in (None, "", [], {}) else None
+
+
+def _search_text(value) -> str:
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return " ".join(_search_text(v) for v in value)
+    return textnorm.normalize(value) if isinstance(value, str) else ""
+
+
+def _delete_paper(db: sqlite3.Connection, paper: str):
+    db.execute("DELETE FROM questions_fts WHERE rowid IN (SELECT rowid FROM questions WHERE paper = ?)", (paper,))
+    db.execute("DELETE FROM questions WHERE paper = ?", (paper,))
+    db.execute("DELETE FROM papers WHERE paper = ?", (paper,))
+
+
+def _load_paper(db: sqlite3.Connection, subject, path, digest: str) -> int:
+    items = corpus.read_items_from_file(str(path))
+    match = _PAPER.search(path.stem)
+    year, shift = (int(match.group(1)), match.group(2)) if match else (None, None)
+    db.execute("INSERT INTO papers (paper, subject, year, shift, sha256) VALUES (?, ?, ?, ?, ?)",
+               (path.stem, subject.name, year, shift, digest))
+    count = 0
+    for position, q in enumerate(items):
+        if not isinstance(q, dict):
+            continue
+        cursor = db.execute(
+            "INSERT INTO questions (subject, paper, year, shift, id, position, type, chapter, chapter_name,"
+            " question, prashna, options, vikalpa, sub_questions, context, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (subject.name, path.stem, year, shift, str(q.get("id")), position,
+             corpus.normalize_type(q.get("type", "")),
+             None if q.get("chapter") in (None, "") else str(q.get("chapter")), q.get("chapter_name"),
+             q.get("question") if isinstance(q.get("question"), str) else _json_or_none(q.get("question")),
+             q.get("prashna") if isinstance(q.get("prashna"), str) else _json_or_none(q.get("prashna")),
+             _json_or_none(q.get("options")), _json_or_none(q.get("vikalpa")),
+             _json_or_none(q.get("sub_questions")), _json_or_none(q.get("context")),
+             json.dumps(q, ensure_ascii=False)),
+        )
+        db.execute("INSERT INTO questions_fts (rowid, question, prashna, options, vikalpa) VALUES (?, ?, ?, ?, ?)",
+                   (cursor.lastrowid,
+                    _search_text([q.get("question"), q.get("context"), q.get("sub_questions")]),
+                    _search_text(q.get("prashna")), _search_text(q.get("options")), _search_text(q.get("vikalpa"))))
+        count += 1
+    return count
+
+
+def export_subject(subject, db: sqlite3.Connection = None) -> dict:
+    """Brings the subject's rows in line with `{subject}_data_annotated/`. Returns counts of what changed."""
+    own_db = db is None
+    db = db or connect()
+    stats = {"loaded": 0, "removed": 0, "unchanged": 0, "questions": 0}
+    try:
+        recorded = dict(db.execute("SELECT paper, sha256 FROM papers WHERE subject = ?", (subject.name,)))
+        current = set()
+        with db:
+            for path in sorted(subject.annotated_dir.glob(f"{subject.prefix}_*.json")):
+                current.add(path.stem)
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                if recorded.get(path.stem) == digest:
+                    stats["unchanged"] += 1
+                    continue
+                _delete_paper(db, path.stem)
+                try:
+                    stats["questions"] += _load_paper(db, subject, path, digest)
+                except (OSError, ValueError) as e:
+                    print(f"Failed to read {path}: {e}")
+                    continue
+                stats["loaded"] += 1
+            for paper in set(recorded) - current:
+                _delete_paper(db, paper)
+                stats["removed"] += 1
+    finally:
+        if own_db:
+            db.close()
+    print(f"🗄️  {subject.name}: {stats['loaded']} papers loaded ({stats['questions']} questions), "
+          f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+    return stats
+
+
+def export(subject_names=subjects.NAMES, path: str = None):
+    db = connect(path)
+    try:
+        for name in subject_names:
+            export_subject(subjects.get(name), db)
+        db.execute("INSERT INTO questions_fts (questions_fts) VALUES ('optimize')")
+        db.commit()
+    finally:
+        db.close()
+
+
+def search(db: sqlite3.Connection, query: str, subject: str = None, limit: int = 20) -> list:
+    """Questions matching every word of `query` (English or Hindi), best BM25 match first."""
+    terms = textnorm.tokens(query)
+    if not terms:
+        return []
+    match = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    sql = ("SELECT q.subject, q.paper, q.id, q.type, q.chapter_name, q.question, q.prashna,"
+           " bm25(questions_fts, 1.0, 1.0, 0.5, 0.5) AS score"
+           " FROM questions_fts JOIN questions q ON q.rowid = questions_fts.rowid"
+           " WHERE questions_fts MATCH ?")
+    params = [match]
+    if subject:
+        sql += " AND q.subject = ?"
+        params.append(subject)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    columns = ["subject", "paper", "id", "type", "chapter_name", "question", "prashna", "score"]
+    return [dict(zip(columns, row)) for row in db.execute(sql, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export annotated papers to SQLite and search them.")
+    parser.add_argument("subjects", nargs="*", help=f"Subjects to export (default: {' '.join(subjects.NAMES)})")
+    parser.add_argument("--db", default=os.environ.get("PYQS_DB", DEFAULT_DB), help="Database path")
+    parser.add_argument("--search", help="Search the database instead of exporting")
+    parser.add_argument("--subject", choices=subjects.NAMES, help="Restrict --search to one subject")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    for name in args.subjects:
+        if name not in subjects.SUBJECTS:
+            parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+    if args.search:
+        db = connect(args.db)
+        for r in search(db, args.search, args.subject, args.limit):
+            text = (r["question"] or r["prashna"] or "").replace("\n", " ")
+            print(f"{r['paper']:<14} {r['id']:<12} {r['chapter_name'] or '-'}\n    {text[:160]}")
+        db.close()
+        return
+    export(args.subjects or subjects.NAMES, args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Durable job table for every (paper, stage) of the pipeline.
+
+The batch scripts used to treat "the output file exists" as "done", so a crash in the
+middle of a write left a half file that was never redone. Each stage now records its
+jobs here, and outputs are written with `utils.atomic_write_json` (temp file + rename):
+
+    .pipeline/jobs.sqlite3   (paper, stage) -> status, attempts, timings, tokens, output hash
+
+A paper is `subject/stem` (e.g. `science/sci_2011i`); stages are `extract` and
+`annotate`. `is_done` is what the batch and recover scripts check before scheduling a
+job. Outputs written before the job table existed are adopted if they parse. A new
+extract output marks the paper's `annotate` job stale, so it is redone as well.
+
+Usage:
+    python job_store.py                  # per-stage summary
+    python job_store.py failed           # list failed jobs with their last error
+    python job_store.py reset <stage>    # forget a stage so it is redone
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_DB = ".pipeline/jobs.sqlite3"
+
+RUNNING, DONE, FAILED, STALE = "running", "done", "failed", "stale"
+
+# stage -> the stages that read its output
+DOWNSTREAM = {"extract": ("annotate",)}
+
+
+def paper_key(output_path) -> str:
+    """`science_data_annotated/sci_2011i.json` -> `science/sci_2011i`"""
+    path = pathlib.Path(output_path)
+    folder = path.parent.name
+    subject = folder[:folder.index("_data")] if "_data" in folder else folder
+    return f"{subject}/{path.stem}"
+
+
+def output_hash(path) -> str:
+    return hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+
+
+def _valid_json(path: pathlib.Path) -> bool:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+class JobStore:
+    def __init__(self, db_path: str = DEFAULT_DB):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " paper TEXT, stage TEXT, status TEXT, attempts INTEGER DEFAULT 0,"
+            " started_at REAL, finished_at REAL, duration REAL,"
+            " prompt_tokens INTEGER DEFAULT 0, output_tokens INTEGER DEFAULT 0,"
+            " output_path TEXT, output_hash TEXT, error TEXT,"
+            " PRIMARY KEY (paper, stage))"
+        )
+        self._db.commit()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+        return rows
+
+    def get(self, paper: str, stage: str):
+        """Returns the job row as a dict, or None."""
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM jobs WHERE paper = ? AND stage = ?", (paper, stage))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        return dict(zip(columns, row)) if row else None
+
+    def start(self, paper: str, stage: str):
+        self._execute(
+            "INSERT INTO jobs (paper, stage, status, attempts, started_at) VALUES (?, ?, ?, 1, ?)"
+            " ON CONFLICT (paper, stage) DO UPDATE SET status = excluded.status,"
+            " attempts = attempts + 1, started_at = excluded.started_at, error = NULL",
+            (paper, stage, RUNNING, time.time()),
+        )
+
+    def finish(self, paper: str, stage: str, output_path, usage: dict = None):
+        """
+        Marks the job done; `output_path` must already be written (atomically).
+
+        If the job had a record and its output changed, the DOWNSTREAM jobs of the
+        paper are marked stale.
+        """
+        usage = usage or {}
+        now = time.time()
+        new_hash = output_hash(output_path)
+        previous = self.get(paper, stage)
+        if previous is not None and previous["output_hash"] != new_hash:
+            for downstream in DOWNSTREAM.get(stage, ()):
+                # Inserted if missing, so an orphan output of the old extract is not adopted either
+                self._execute(
+                    "INSERT INTO jobs (paper, stage, status, error) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (paper, stage) DO UPDATE SET status = excluded.status, error = excluded.error",
+                    (paper, downstream, STALE, f"{stage} redone"),
+                )
+        self._execute(
+            "INSERT INTO jobs (paper, stage, status, attempts, started_at) VALUES (?, ?, ?, 0, ?)"
+            " ON CONFLICT (paper, stage) DO NOTHING",
+            (paper, stage, DONE, now),
+        )
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, duration = ? - COALESCE(started_at, ?),"
+            " prompt_tokens = prompt_tokens + ?, output_tokens = output_tokens + ?,"
+            " output_path = ?, output_hash = ?, error = NULL WHERE paper = ? AND stage = ?",
+            (DONE, now, now, now, usage.get("prompt_tokens", 0), usage.get("output_tokens", 0),
+             str(output_path), new_hash, paper, stage),
+        )
+
+    def fail(self, paper: str, stage: str, error, usage: dict = None):
+        usage = usage or {}
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, duration = ? - COALESCE(started_at, ?),"
+            " prompt_tokens = prompt_tokens + ?, output_tokens = output_tokens + ?, error = ?"
+            " WHERE paper = ? AND stage = ?",
+            (FAILED, now, now, now, usage.get("prompt_tokens", 0), usage.get("output_tokens", 0),
+             str(error), paper, stage),
+        )
+
+    def is_done(self, paper: str, stage: str, output_path) -> bool:
+        """
+        True if the job finished and its output is still the file it wrote.
+
+        An output with no job record at all (written before the job table existed, or
+        by hand) is adopted if it parses as JSON; a half-written one is not. An output
+        whose job is running, failed, stale or done with a different file is not.
+        """
+        path = pathlib.Path(output_path)
+        if not path.exists():
+            return False
+        job = self.get(paper, stage)
+        if job is not None:
+            return job["status"] == DONE and job["output_hash"] == output_hash(path)
+        if not _valid_json(path):
+            return False
+        self.finish(paper, stage, path)
+        return True
+
+    def reset(self, stage: str) -> int:
+        with self._lock:
+            removed = self._db.execute("DELETE FROM jobs WHERE stage = ?", (stage,)).rowcount
+            self._db.commit()
+        return removed
+
+    def summary(self) -> list:
+        """(stage, status, jobs, attempts, prompt tokens, output tokens) rows."""
+        return self._execute(
+            "SELECT stage, status, COUNT(*), SUM(attempts), SUM(prompt_tokens), SUM(output_tokens)"
+            " FROM jobs GROUP BY stage, status ORDER BY stage, status"
+        )
+
+    def failed(self) -> list:
+        return self._execute(
+            "SELECT paper, stage, attempts, error FROM jobs WHERE status = ? ORDER BY stage, paper", (FAILED,)
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore(os.environ.get("PIPELINE_JOB_DB", DEFAULT_DB))
+        return _store
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+    store = get_job_store()
+
+    if command == "reset":
+        stage = sys.argv[2]
+        print(f"🧹 Forgot {store.reset(stage)} {stage} jobs")
+        return
+    if command == "failed":
+        for paper, stage, attempts, error in store.failed():
+            print(f"❌ {stage:<9} {paper:<28} attempts={attempts}  {error}")
+        return
+
+    print(f"📋 Jobs in {store.db_path}")
+    for stage, status, count, attempts, prompt_tokens, output_tokens in store.summary():
+        print(f"   {stage:<9} {status:<8} {count:>4} jobs, {attempts or 0:>4} attempts, "
+              f"{prompt_tokens or 0:>9} prompt / {output_tokens or 0:>8} output tokens")
+
+
+if __name__ == "__main__":
+    main()
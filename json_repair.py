@@ -0,0 +1,190 @@
+"""
+Single-pass JSON repair for model output.
+
+Replaces the regex passes of the old `utils.clean_json_response` with one linear
+scan that knows whether it is inside a string literal:
+
+- strips markdown fences and prose before the first `[`/`{` and after the value closes
+- backslashes: keeps valid JSON escapes (including `\\\\`), escapes stray ones
+  (`\\alpha`, `\\sqrt`, `\\%`) and LaTeX commands that happen to start with a JSON
+  escape letter (`\\frac`, `\\beta`, `\\times`, `\\neq`), while `\\nThe` stays a newline
+- raw control characters inside strings (literal newlines, tabs) are escaped
+- a quote inside a string that is not followed by `,` `:` `}` `]` is escaped
+- trailing commas before `}`/`]` are dropped, missing commas between values inserted
+
+`loads` first tries the C JSON scanner on the located value, after one linear scan
+for LaTeX commands that would silently decode as control characters. Only text that
+fails that check goes through the tokenizer.
+"""
+import json
+import re
+
+# LaTeX commands whose first letter is also a JSON escape (\b \f \n \r \t)
+LATEX_COMMANDS = {
+    # \b
+    "bar", "beta", "because", "begin", "bf", "big", "bigg", "bigcirc", "binom", "bmod", "bot", "boxed", "bullet",
+    # \f
+    "forall", "frac", "frown", "flat",
+    # \n
+    "nabla", "ne", "neg", "neq", "newline", "ni", "nmid", "not", "notin", "nu",
+    # \r
+    "rangle", "rceil", "rfloor", "rho", "right", "rightarrow", "rightleftharpoons", "rm",
+    # \t
+    "tan", "tau", "text", "textbf", "textit", "textrm", "tfrac", "therefore", "theta", "tilde", "times",
+    "to", "top", "triangle", "triangleq",
+}
+
+VALID_ESCAPES = set('"\\/bfnrtu')
+HEX_DIGITS = set("0123456789abcdefABCDEF")
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+
+_FENCE = re.compile(r"```(?:json)?\s*")
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_LETTERS = re.compile(r"[A-Za-z]+")
+_WHITESPACE = re.compile(r"\s*")
+
+# One token per match, leading whitespace included. Strings without escapes, control
+# characters or inner quotes take the `str` fast path; everything else goes through
+# _read_string character class by character class.
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<str>"[^"\\\x00-\x1f]*"(?=\s*(?:[,:}\]"]|$)))
+  | (?P<quote>")
+  | (?P<open>[{\[])
+  | (?P<close>[}\]])
+  | (?P<comma>,)
+  | (?P<colon>:)
+  | (?P<scalar>-?\d[\d.eE+\-]*|true|false|null)
+  | (?P<other>.)
+)""", re.VERBOSE | re.DOTALL)
+
+
+# A LaTeX command behind an odd number of backslashes, e.g. `\frac` but not `\\frac`
+_LATEX_HAZARD = re.compile(
+    r"(?<!\\)(?:\\\\)*\\(?:" + "|".join(sorted(LATEX_COMMANDS, key=len, reverse=True)) + r")(?![A-Za-z])"
+)
+_DECODER = json.JSONDecoder()
+
+
+def _json_start(text: str):
+    """Index of the first `[`/`{` after an optional markdown fence, or None."""
+    fence = _FENCE.search(text)
+    start_search = fence.end() if fence else 0
+    starts = [i for i in (text.find("[", start_search), text.find("{", start_search)) if i != -1]
+    return min(starts) if starts else None
+
+
+def repair_json(raw_text: str) -> str:
+    """Returns `raw_text` repaired into (ideally) valid JSON text."""
+    text = raw_text
+    pos = _json_start(text)
+    if pos is None:
+        return text.strip()
+    n = len(text)
+
+    out = []
+    append = out.append
+    depth = 0                # open containers
+    after_value = False      # the last token completed a value (or object key)
+    pending_comma = False
+    match = _TOKEN.match
+
+    while pos < n:
+        m = match(text, pos)
+        if m is None:        # only trailing whitespace left
+            break
+        kind = m.lastgroup
+        pos = m.end()
+
+        if kind == "comma":
+            if after_value:
+                pending_comma = True
+                after_value = False
+        elif kind == "close":
+            pending_comma = False  # trailing comma
+            depth -= 1
+            append(m.group(kind))
+            after_value = True
+            if depth <= 0:
+                break  # anything after the closed top-level value is prose
+        elif kind == "colon":
+            append(":")
+            after_value = False
+        elif kind == "other":
+            pass  # stray character outside any string (prose, markdown): drop it
+        else:
+            if pending_comma or after_value:
+                append(",")  # restore a dropped or missing comma
+            pending_comma = False
+            if kind == "open":
+                depth += 1
+                append(m.group(kind))
+                after_value = False
+            elif kind == "quote":
+                pos = _read_string(text, m.start(kind), out)
+                after_value = True
+            else:
+                append(m.group(kind))
+                after_value = True
+
+    return "".join(out)
+
+
+def _read_string(text: str, pos: int, out: list) -> int:
+    """Copies the string literal starting at `text[pos] == '"'` into `out`, repaired. Returns the end position."""
+    n = len(text)
+    out.append('"')
+    pos += 1
+    while pos < n:
+        m = _STRING_SPECIAL.search(text, pos)
+        if not m:
+            out.append(text[pos:])
+            return n
+        out.append(text[pos:m.start()])
+        pos = m.start()
+        ch = text[pos]
+
+        if ch == '"':
+            # Closing quote only if followed by structure; otherwise it is an unescaped inner quote
+            nxt = _WHITESPACE.match(text, pos + 1).end()
+            if nxt >= n or text[nxt] in ',:}]"':
+                out.append('"')
+                return pos + 1
+            out.append('\\"')
+            pos += 1
+        elif ch == "\\":
+            pos = _read_escape(text, pos, out)
+        else:
+            out.append(CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+            pos += 1
+    return pos
+
+
+def _read_escape(text: str, pos: int, out: list) -> int:
+    nxt = text[pos + 1] if pos + 1 < len(text) else ""
+    if nxt and nxt in "bfnrt":
+        word = _LETTERS.match(text, pos + 1).group()
+        if word in LATEX_COMMANDS:
+            out.append("\\\\" + word)
+            return pos + 1 + len(word)
+    if nxt == "u":
+        hex_part = text[pos + 2:pos + 6]
+        if len(hex_part) == 4 and all(c in HEX_DIGITS for c in hex_part):
+            out.append(text[pos:pos + 6])
+            return pos + 6
+    elif nxt and nxt in VALID_ESCAPES:
+        out.append(text[pos:pos + 2])
+        return pos + 2
+    # Not a JSON escape: keep the backslash as a literal character
+    out.append("\\\\")
+    return pos + 1
+
+
+def loads(raw_text: str):
+    """Repairs and parses model output. Raises json.JSONDecodeError if it is still invalid."""
+    start = _json_start(raw_text)
+    if start is not None and not _LATEX_HAZARD.search(raw_text, start):
+        try:
+            return _DECODER.raw_decode(raw_text, start)[0]
+        except json.JSONDecodeError:
+            pass
+    return json.loads(repair_json(raw_text))
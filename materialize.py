@@ -0,0 +1,161 @@
+"""
+Single-pass materializer for the organized views of a subject.
+
+Replaces split_{subject}_by_chapter.py, split_{subject}_by_type.py and
+split_{subject}_types_by_chapters.py, which parsed the merged corpus twice and
+then re-parsed every type file. One pass over the merged corpus groups each
+question by chapter, by type and by type x chapter at once, then writes:
+
+    {subject}_pro_chapters/chapter-*.json + manifest.json
+    {subject}_pro_types/type-*.json + manifest.json
+    {subject}_pro_type_chapters/{type}_chapters/chapter-*.json + manifest.json, overall_manifest.json
+
+The files are the same as the three scripts produced. Every question sits at the
+same depth in all three views, so its JSON text is encoded once and reused. Files
+whose content did not change are not rewritten (corpus.write_text).
+
+Usage:
+    python materialize.py                  # all subjects
+    python materialize.py hindi sanskrit
+"""
+import json
+import os
+import sys
+from typing import Any, Dict, List
+import corpus
+import subjects
+
+YearMap = Dict[str, List[Dict[str, Any]]]
+
+
+def group_views(data: YearMap):
+    """
+    One pass over `{year: [items]}`.
+
+    Returns:
+        (chapters, types, type_chapters) - `{chapter: {year: items}}`, `{type: {year: items}}`
+        and `{type: {chapter: {year: items}}}`, keys in order of first appearance.
+    """
+    chapters: Dict[str, YearMap] = {}
+    types: Dict[str, YearMap] = {}
+    type_chapters: Dict[str, Dict[str, YearMap]] = {}
+
+    for year, items in data.items():
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            chapter_key = corpus.chapter_key_of(item)
+            type_name = corpus.normalize_type(item.get("type", ""))
+            chapters.setdefault(chapter_key, {}).setdefault(year, []).append(item)
+            types.setdefault(type_name, {}).setdefault(year, []).append(item)
+            type_chapters.setdefault(type_name, {}).setdefault(chapter_key, {}).setdefault(year, []).append(item)
+    return chapters, types, type_chapters
+
+
+class ViewEncoder:
+    """
+    Encodes `{year: [items]}` exactly like `json.dumps(..., ensure_ascii=False, indent=2)`,
+    encoding each item only once however many views it appears in.
+    """
+
+    def __init__(self):
+        self._items = {}  # id(item) -> encoded text at list depth
+
+    def _item(self, item) -> str:
+        text = self._items.get(id(item))
+        if text is None:
+            text = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            self._items[id(item)] = text
+        return text
+
+    def encode(self, year_map: YearMap) -> str:
+        if not year_map:
+            return "{}"
+        years = []
+        for year, items in corpus.order_years(year_map).items():
+            key = json.dumps(year, ensure_ascii=False)
+            body = ",\n    ".join(self._item(item) for item in items)
+            years.append(f'  {key}: [\n    {body}\n  ]' if items else f'  {key}: []')
+        return "{\n" + ",\n".join(years) + "\n}"
+
+
+def _write_chapter_view(chapters: Dict[str, YearMap], output_dir: str, encoder: ViewEncoder) -> List[Dict[str, Any]]:
+    """One `chapter-<slug>.json` per chapter plus `manifest.json`. Returns the manifest."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = []
+    for chapter_key, year_map in chapters.items():
+        filename = f"chapter-{corpus.slugify(chapter_key)}.json"
+        corpus.write_text(os.path.join(output_dir, filename), encoder.encode(year_map))
+        manifest.append({
+            "chapter": chapter_key,
+            "file": filename,
+            "total_items": sum(len(v) for v in year_map.values()),
+            "years": len(year_map)
+        })
+    corpus.write_json(os.path.join(output_dir, "manifest.json"), manifest)
+    return manifest
+
+
+def materialize(subject, data: YearMap = None) -> None:
+    """Writes the chapter, type and type x chapter views of the subject's merged corpus."""
+    if data is None:
+        data = corpus.load_merged(subject)
+    chapters, types, type_chapters = group_views(data)
+    encoder = ViewEncoder()
+
+    # By chapter
+    chapters_dir = str(subject.chapters_dir)
+    manifest = _write_chapter_view(chapters, chapters_dir, encoder)
+    print(f"Wrote {len(manifest)} chapter files to {chapters_dir}")
+
+    # By type
+    types_dir = str(subject.types_dir)
+    os.makedirs(types_dir, exist_ok=True)
+    manifest = []
+    for type_name, year_map in types.items():
+        filename = f"type-{type_name}.json"
+        corpus.write_text(os.path.join(types_dir, filename), encoder.encode(year_map))
+        manifest.append({
+            "type": type_name,
+            "file": filename,
+            "total_items": sum(len(v) for v in year_map.values()),
+            "years": len(year_map)
+        })
+    corpus.write_json(os.path.join(types_dir, "manifest.json"), manifest)
+    print(f"Wrote {len(types)} type files to {types_dir}")
+    for entry in manifest:
+        print(f"{entry['type']}: {entry['total_items']} items across {entry['years']} years")
+
+    # By type x chapter
+    base_output_dir = str(subject.type_chapters_dir)
+    overall_manifest = []
+    for type_name in corpus.TYPES:
+        if type_name not in type_chapters:
+            print(f"Warning: no {type_name} questions, skipping")
+            continue
+        manifest = _write_chapter_view(type_chapters[type_name],
+                                       os.path.join(base_output_dir, f"{type_name}_chapters"), encoder)
+        overall_manifest.append({
+            "type": type_name,
+            "total_chapters": len(manifest),
+            "total_items": sum(entry["total_items"] for entry in manifest),
+            "chapters": manifest
+        })
+        print(f"{type_name}: {len(manifest)} chapter files, {overall_manifest[-1]['total_items']} items")
+
+    os.makedirs(base_output_dir, exist_ok=True)
+    overall_manifest_path = os.path.join(base_output_dir, "overall_manifest.json")
+    corpus.write_json(overall_manifest_path, overall_manifest)
+    print(f"Overall manifest written to: {overall_manifest_path}")
+
+
+def main():
+    names = sys.argv[1:] or subjects.NAMES
+    for name in names:
+        materialize(subjects.get(name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Runs any set of subjects and stages in one process.
+
+Replaces running the 42 per-subject scripts one after another: one event loop, one
+model client, one rate limiter and one pool of `--concurrency` slots are shared by
+every subject. Each paper goes through extraction and annotation back to back, and
+a subject is merged and split as soon as its last paper is annotated, handing the
+parsed corpus from stage to stage in memory. Merge and split steps whose inputs did
+not change are skipped (see build_graph.py). Export reloads the subject's changed
+papers into the SQLite database (see export_sqlite.py).
+
+Usage:
+    python orchestrator.py                                   # everything
+    python orchestrator.py --subjects hindi sanskrit
+    python orchestrator.py --stages merge split              # rebuild the views only
+    python orchestrator.py --subjects science --stages extract --concurrency 8
+    python orchestrator.py --subjects hindi --structured --compact   # schema-constrained, short keys
+    python orchestrator.py --stages extract --shard-pages 4          # concurrent 4-page windows
+    python orchestrator.py --stages extract --sections               # Section A and B side by side
+
+The batch_processing_*, batch_annotate_* and merge_* scripts are thin wrappers
+around `run` and corpus.py (the latter always rebuilds).
+"""
+import argparse
+import asyncio
+import time
+import annotation_cache
+import async_engine
+import build_graph
+import chapter_classifier
+import export_sqlite
+import job_store
+import page_shards
+import response_schemas
+import subjects
+import upload_registry
+import utils
+
+STAGES = ["extract", "annotate", "merge", "split", "export"]
+
+logger = utils.setup_logger('orchestrator', 'logs/orchestrator.log')
+
+
+def pending_papers(subject, stages) -> list:
+    """
+    `(input_pdf, extracted_json, annotated_json)` for every paper of the subject that has
+    work left in `stages`: PDFs of every year/shift first, then extracted papers without a PDF.
+    """
+    jobs = job_store.get_job_store()
+    papers = []
+    seen = set()
+    missing = 0
+
+    for input_pdf, output_json in subject.papers():
+        if not input_pdf.exists():
+            missing += 1
+            continue
+        seen.add(output_json.name)
+        papers.append((input_pdf, output_json, subject.annotated_dir / output_json.name))
+    for output_json in sorted(subject.data_dir.glob("*.json")):
+        if output_json.name not in seen:
+            papers.append((None, output_json, subject.annotated_dir / output_json.name))
+
+    pending = []
+    for input_pdf, output_json, annotated_json in papers:
+        extract = ("extract" in stages and input_pdf is not None
+                   and not jobs.is_done(job_store.paper_key(output_json), "extract", output_json))
+        # A paper that is extracted again is annotated again (the extract marks its annotate job stale)
+        annotate = ("annotate" in stages
+                    and (extract or not jobs.is_done(job_store.paper_key(annotated_json), "annotate", annotated_json)))
+        if extract or annotate:
+            pending.append((input_pdf if extract else None, output_json, annotated_json if annotate else None))
+
+    print(f"📚 {subject.label}: {len(pending)} papers with work left, "
+          f"{len(papers) - len(pending)} done, {missing} PDFs not found")
+    return pending
+
+
+async def _run_paper(subject, input_pdf, output_json, annotated_json, model, semaphore, stream, classify,
+                     compact, structured, shard_pages, shard_overlap, sections) -> list:
+    """Extraction then annotation of one paper; annotation is skipped if extraction failed."""
+    results = []
+    if input_pdf is not None:
+        extraction = subject.extraction()
+        result = await async_engine.process_single_paper(
+            input_pdf, output_json, extraction.generate_extraction_prompt, extraction.logger,
+            model, semaphore, stream=stream, mirrored_fields=subject.mirrored_fields, compact=compact,
+            generation_config=subject.extraction_config(compact) if structured else None,
+            shard_pages=shard_pages, shard_overlap=shard_overlap, sections=sections
+        )
+        results.append(dict(result, stage="extract"))
+        if result["status"] != "success":
+            return results
+    if annotated_json is not None and output_json.exists():
+        subject.annotated_dir.mkdir(exist_ok=True)
+        result = await async_engine.process_single_annotation(
+            output_json, annotated_json, subject.annotation_prompt, subject.chapters, subject.annotation_logger(),
+            model, semaphore, classifier=chapter_classifier.for_subject(subject) if classify else None,
+            cache=annotation_cache.for_subject(subject),
+            generation_config=response_schemas.annotation_config() if structured else None
+        )
+        results.append(dict(result, stage="annotate"))
+    return results
+
+
+async def _run_subject(subject, stages, model, semaphore, stream, classify, compact, structured,
+                       shard_pages, shard_overlap, sections) -> list:
+    results = []
+    if "extract" in stages or "annotate" in stages:
+        subject.data_dir.mkdir(exist_ok=True)
+        papers = pending_papers(subject, stages)
+        for paper_results in await asyncio.gather(*[
+            _run_paper(subject, pdf, out, annotated, model, semaphore, stream, classify, compact, structured,
+                       shard_pages, shard_overlap, sections)
+            for pdf, out, annotated in papers
+        ]):
+            results.extend(paper_results)
+
+    # Merge and split rebuild only what changed, handing the corpus over in memory
+    if "merge" in stages or "split" in stages:
+        build_graph.build_subject(subject, stages)
+    if "export" in stages:
+        export_sqlite.export_subject(subject)
+    return results
+
+
+async def run_async(subject_names, stages, max_concurrency: int = async_engine.DEFAULT_CONCURRENCY,
+                    stream: bool = True, classify: bool = True, compact: bool = False,
+                    structured: bool = False, shard_pages: int = 0,
+                    shard_overlap: int = page_shards.DEFAULT_OVERLAP, sections: bool = False) -> list:
+    selected = [subjects.get(name) for name in subject_names]
+    model = None
+    reaper = None
+    if "extract" in stages or "annotate" in stages:
+        model = utils.get_generative_model(model_name=async_engine.DEFAULT_MODEL)
+        reaper = asyncio.create_task(upload_registry.reap_periodically(logger))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    try:
+        results = []
+        for subject_results in await asyncio.gather(*[
+            _run_subject(subject, stages, model, semaphore, stream, classify, compact, structured,
+                         shard_pages, shard_overlap, sections)
+            for subject in selected
+        ]):
+            results.extend(subject_results)
+        return results
+    finally:
+        if reaper:
+            reaper.cancel()
+
+
+def print_summary(results: list, total_time: float):
+    print(f"\n{'='*60}")
+    print(f"📊 SUMMARY")
+    print(f"{'='*60}")
+
+    for stage in ("extract", "annotate"):
+        stage_results = [r for r in results if r["stage"] == stage]
+        if not stage_results:
+            continue
+        successful = [r for r in stage_results if r["status"] == "success"]
+        failed = [r for r in stage_results if r["status"] == "error"]
+
+        print(f"{stage}:")
+        print(f"✅ Successful: {len(successful)}")
+        print(f"❌ Failed: {len(failed)}")
+        if successful:
+            avg_time = sum(r["time"] for r in successful) / len(successful)
+            print(f"📈 Average time per paper: {avg_time:.2f}s")
+        if failed:
+            print(f"\n❌ Failed papers:")
+            for r in failed:
+                print(f"   - {r['input']}: {r['error']}")
+
+    print(f"⏱️  Total time: {total_time:.2f}s ({total_time/60:.2f}min)")
+
+
+def run(subject_names=subjects.NAMES, stages=STAGES, max_concurrency: int = async_engine.DEFAULT_CONCURRENCY,
+        stream: bool = True, classify: bool = True, compact: bool = False, structured: bool = False,
+        shard_pages: int = 0, shard_overlap: int = page_shards.DEFAULT_OVERLAP, sections: bool = False) -> list:
+    """Runs `stages` for `subject_names` in this process and prints a summary. Returns the per-paper results."""
+    stages = [s for s in STAGES if s in stages]
+    print(f"\n{'='*60}")
+    print(f"📚 {', '.join(subject_names)}: {' -> '.join(stages)} with up to {max_concurrency} calls in flight")
+    print(f"{'='*60}\n")
+
+    total_start = time.time()
+    results = asyncio.run(run_async(subject_names, stages, max_concurrency=max_concurrency, stream=stream,
+                                    classify=classify, compact=compact, structured=structured,
+                                    shard_pages=shard_pages, shard_overlap=shard_overlap, sections=sections))
+    if results:
+        print_summary(results, time.time() - total_start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline stages for any set of subjects in one process.")
+    parser.add_argument("--subjects", nargs="+", choices=subjects.NAMES, default=subjects.NAMES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--concurrency", type=int, default=async_engine.DEFAULT_CONCURRENCY,
+                        help="Gemini calls in flight across all subjects")
+    parser.add_argument("--no-stream", action="store_true", help="Don't stream extraction output")
+    parser.add_argument("--no-classifier", action="store_true",
+                        help="Send every question to Gemini for annotation (no local chapter classifier)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Ask for the short-key extraction format (wire_schema.py) and expand it locally")
+    parser.add_argument("--structured", action="store_true",
+                        help="Request JSON constrained to a response schema (response_schemas.py) instead of free text")
+    parser.add_argument("--shard-pages", type=int, default=0, metavar="N",
+                        help="Extract each paper in concurrent windows of N pages (needs pypdf; default: whole PDF)")
+    parser.add_argument("--shard-overlap", type=int, default=page_shards.DEFAULT_OVERLAP, metavar="N",
+                        help="Pages shared by consecutive windows")
+    parser.add_argument("--sections", action="store_true",
+                        help="Extract Section A (objective) and Section B concurrently from the same upload")
+    args = parser.parse_args()
+
+    if args.shard_pages and args.sections:
+        parser.error("--sections and --shard-pages cannot be combined")
+    if args.shard_pages:
+        if not page_shards.available():
+            parser.error("--shard-pages needs pypdf: pip install pypdf")
+        if not 0 <= args.shard_overlap < args.shard_pages:
+            parser.error("--shard-overlap must be at least 0 and smaller than --shard-pages")
+    run(args.subjects, args.stages, max_concurrency=args.concurrency, stream=not args.no_stream,
+        classify=not args.no_classifier, compact=args.compact,
+        structured=args.structured, shard_pages=args.shard_pages, shard_overlap=args.shard_overlap,
+        sections=args.sections)
+
+
+if __name__ == "__main__":
+    main()
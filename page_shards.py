@@ -0,0 +1,164 @@
+"""
+Page-sharded extraction helpers.
+
+A whole paper is one sequential generation, so its latency grows with the page
+count. Sharded extraction instead cuts the PDF locally into overlapping page
+windows (pages 1-4, 4-7, 7-10, ... for 4 pages with 1 page of overlap), extracts
+every window concurrently (see async_engine.extract_sharded) and stitches the
+answers back together, so a paper takes as long as its slowest window.
+
+Stitching walks the windows in page order:
+
+- a question at the start of a window that matches one from the previous window
+  (the overlap page, or a question cut off at the previous window's last page) is
+  the same question: the more complete copy is kept, in the earlier position;
+- ids are renumbered per type across windows, since every window numbers from 1:
+  obj_1..obj_12 + obj_1..obj_9 -> obj_1..obj_21, alternatives keep their suffix
+  (long_3_1, long_3_2), including a pair split across two windows.
+
+Splitting needs pypdf (`pip install pypdf`); nothing else in the pipeline does.
+Shard PDFs are cut once per source file and kept in `.pipeline/shards/`.
+"""
+import hashlib
+import pathlib
+import re
+import dedup_index
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+DEFAULT_PAGES = 4
+DEFAULT_OVERLAP = 1
+SHARD_DIR = pathlib.Path(".pipeline/shards")
+
+_ID = re.compile(r"^(.*?)_(\d+)(?:_(\d+))?$")
+
+
+def available() -> bool:
+    return pypdf is not None
+
+
+def page_windows(page_count: int, pages: int = DEFAULT_PAGES, overlap: int = DEFAULT_OVERLAP) -> list:
+    """`[(start, end)]` 0-based, end-exclusive windows of `pages` pages, consecutive windows sharing `overlap`."""
+    if not 0 <= overlap < pages:
+        raise ValueError("overlap must be at least 0 and smaller than the window size")
+    windows = []
+    start = 0
+    while True:
+        end = min(start + pages, page_count)
+        windows.append((start, end))
+        if end >= page_count:
+            return windows
+        start = end - overlap
+
+
+def split_pdf(input_path: pathlib.Path, pages: int = DEFAULT_PAGES, overlap: int = DEFAULT_OVERLAP) -> list:
+    """
+    Cuts `input_path` into page windows.
+
+    Returns:
+        `[(shard pdf path, (start, end))]`, or `[]` if the paper fits in one window.
+
+    Raises:
+        RuntimeError: If pypdf is not installed.
+    """
+    if pypdf is None:
+        raise RuntimeError("Page-sharded extraction needs pypdf: pip install pypdf")
+    reader = pypdf.PdfReader(str(input_path))
+    windows = page_windows(len(reader.pages), pages, overlap)
+    if len(windows) == 1:
+        return []
+
+    # Keyed by content so a re-run reuses the same shard bytes (and their uploads and cache entries)
+    digest = hashlib.sha256(input_path.read_bytes()).hexdigest()[:16]
+    shard_dir = SHARD_DIR / digest
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shards = []
+    for start, end in windows:
+        path = shard_dir / f"{input_path.stem}_p{start + 1:03d}-{end:03d}.pdf"
+        if not path.exists():
+            writer = pypdf.PdfWriter()
+            for i in range(start, end):
+                writer.add_page(reader.pages[i])
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                writer.write(f)
+            tmp.replace(path)
+        shards.append((path, (start, end)))
+    return shards
+
+
+def shard_note(start: int, end: int, page_count: int) -> str:
+    """Prompt addendum telling the model which part of the paper it is looking at."""
+    return (
+        f"\n\nNOTE: this file holds only pages {start + 1}-{end} of a {page_count}-page paper. "
+        "Extract every question that starts on these pages, numbering ids from 1 as usual. "
+        "Skip text at the top of the first page that continues a question from an earlier page. "
+        "If the last question runs past the last page, extract as much of it as is shown."
+    )
+
+
+def _is_same(shingles: set, other: set) -> bool:
+    if not shingles or not other:
+        return False
+    overlap = len(shingles & other) / min(len(shingles), len(other))
+    return overlap >= dedup_index.THRESHOLD
+
+
+def _renumber(question: dict, shard: int, counters: dict, groups: dict, last_group: dict) -> dict:
+    match = _ID.match(str(question.get("id")))
+    if not match:
+        return question
+    prefix, number, alternative = match.group(1), int(match.group(2)), match.group(3)
+    alternative = int(alternative) if alternative else 0
+    key = (shard, prefix, number)
+    if key not in groups:
+        previous = last_group.get(prefix)
+        if alternative > 1 and previous and previous[1] == alternative - 1:
+            # Second alternative in a new window: the first one ended the previous window
+            groups[key] = previous[0]
+        else:
+            counters[prefix] = counters.get(prefix, 0) + 1
+            groups[key] = counters[prefix]
+    new = groups[key]
+    last_group[prefix] = (new, alternative)
+    return dict(question, id=f"{prefix}_{new}_{alternative}" if alternative else f"{prefix}_{new}")
+
+
+def stitch_shards(shard_questions: list) -> list:
+    """Joins the question lists of consecutive windows: drops overlap duplicates and renumbers ids."""
+    stitched = []
+    counters, groups, last_group = {}, {}, {}
+    previous = []   # (shingles, index in stitched) of the previous window's questions
+    for shard, questions in enumerate(shard_questions):
+        current = []
+        head = True
+        for q in questions:
+            if not isinstance(q, dict):
+                stitched.append(q)
+                continue
+            text = dedup_index.question_text(q)
+            shingles = dedup_index.shingles(text)
+            match = None
+            if head:
+                match = next((i for s, i in previous if _is_same(shingles, s)
+                              and stitched[i].get("type") == q.get("type")), None)
+                head = match is not None
+            if match is None:
+                stitched.append(_renumber(q, shard, counters, groups, last_group))
+                current.append((shingles, len(stitched) - 1))
+                continue
+
+            kept = stitched[match]
+            own = _ID.match(str(q.get("id")))
+            kept_id = _ID.match(str(kept.get("id")))
+            if own and kept_id and own.group(1) == kept_id.group(1):
+                # Later alternatives / ids of this window follow the kept question's number
+                groups.setdefault((shard, own.group(1), int(own.group(2))), int(kept_id.group(2)))
+            if len(text) > len(dedup_index.question_text(kept)):
+                stitched[match] = dict(q, id=kept.get("id"))
+            current.append((shingles, match))
+        previous = current
+    return stitched
@@ -0,0 +1,49 @@
+"""
+Section-parallel extraction helpers.
+
+Every Bihar Board paper splits cleanly into Section A (objective, up to 100 MCQs)
+and Section B (short/long answers, passages, essays, letters, translation).
+Extracting a paper as two section-scoped generations against the same upload
+(see async_engine.extract_sections) runs two shorter generations side by side
+instead of one long one, and the MCQ-heavy half is far less likely to hit the
+output token limit.
+
+Each section's prompt is the subject's extraction prompt plus a note naming the
+section. The answers are merged in id order - Section A, then Section B - keeping
+only the questions that belong to each section, so a question the model puts in
+the wrong half is not duplicated.
+"""
+OBJECTIVE = "objective"
+
+SECTIONS = {
+    "A": (
+        "\n\nNOTE: extract ONLY the objective (multiple-choice) questions of Section A, with ids "
+        "obj_1, obj_2, ... in paper order. Do not output any other question."
+    ),
+    "B": (
+        "\n\nNOTE: extract ONLY the questions that are not multiple-choice (Section B: short and long "
+        "answers, passages, poems, essays, letters, translation and the like), with ids numbered per "
+        "type as usual. Skip every objective question of Section A."
+    ),
+}
+
+
+def in_section(section: str, question) -> bool:
+    is_objective = isinstance(question, dict) and question.get("type") == OBJECTIVE
+    return is_objective if section == "A" else not is_objective
+
+
+def merge_sections(section_questions: dict) -> list:
+    """`{section: questions}` -> one list in section order, each section filtered to its own questions."""
+    merged = []
+    seen = set()
+    for section in SECTIONS:
+        for q in section_questions.get(section) or []:
+            if not in_section(section, q):
+                continue
+            qid = q.get("id") if isinstance(q, dict) else None
+            if qid is not None and qid in seen:
+                continue
+            seen.add(qid)
+            merged.append(q)
+    return merged
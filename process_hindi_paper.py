@@ -1,19 +1,25 @@
-import os
-import json
 import argparse
-import pathlib
 import textwrap
-import time
+import asyncio
 from dotenv import load_dotenv
 import utils
+import async_engine
+import response_schemas
+import wire_schema
 
 # --- Configuration ---
 load_dotenv()
+# The paper is monolingual: the model writes each text once and these mirrors are
+# copied locally before the JSON is written (utils.expand_mirrored_fields)
+MIRRORED_FIELDS = {"question": "prashna", "options": "vikalpa", "sub_questions": "anuprashna"}
+# The `type` values the prompt allows (the enum of the structured-output schema)
+QUESTION_TYPES = ["objective", "comprehension", "essay", "letter_writing", "short_answer", "long_answer"]
+
 logger = utils.setup_logger('process_hindi', 'logs/process_hindi.log')
 
 # --- Core Functions ---
 
-def generate_extraction_prompt(uploaded_file_uri: str) -> list:
+def generate_extraction_prompt(uploaded_file_uri: str, compact: bool = False) -> list:
     prompt = textwrap.dedent("""
     Your task is to act as an expert data extraction engine. You will receive a PDF file of a Bihar Board Class 10 Hindi question paper. You must meticulously extract all questions and convert them into a single, clean JSON array.
 
@@ -31,7 +37,6 @@ def generate_extraction_prompt(uploaded_file_uri: str) -> list:
           - `short_answer`: Short Answer Questions (Laghu Uttariya).
           - `long_answer`: Long Answer Questions (Dirgha Uttariya).
         - `question`: The text of the question (in Hindi).
-        - `prashna`: Same as `question` (since it is already Hindi).
         - `instructions`: Any specific instructions (e.g., "Answer any 5").
 
     3.  **Handling Alternatives**:
@@ -39,19 +44,21 @@ def generate_extraction_prompt(uploaded_file_uri: str) -> list:
 
     4.  **Fields for "objective" Type**:
         - `options`: An object with keys "A", "B", "C", "D".
-        - `vikalpa`: Same as `options` (since it is Hindi copy to both).
 
     5.  **Fields for "comprehension" (Gadyansh)**:
         - `context`: The full text of the passage (Gadyansh).
         - `sub_questions`: Object containing the questions based on the passage.
-        - `anuprashna`: Same as `sub_questions`.
 
-    6.  **Accuracy**:
+    6.  **No Copies**: Write every text once. Do not add `prashna`, `vikalpa` or `anuprashna` fields; they are filled in automatically.
+
+    7.  **Accuracy**:
         - Preserve all Hindi text exactly.
         - Do not translate Hindi to English unless explicitly asked (not required here).
 
     The PDF file is provided. Begin processing now.
     """)
+    if compact:
+        prompt += wire_schema.prompt_section(omit=MIRRORED_FIELDS.values())
 
     return [
         {'text': prompt},
@@ -61,91 +68,26 @@ def generate_extraction_prompt(uploaded_file_uri: str) -> list:
         }}
     ]
 
-def process_question_paper(input_pdf_path: str, output_json_path: str):
-    start_time = time.time()
-    logger.info(f"Starting Hindi processing for: {input_pdf_path}")
-    print(f"🚀 Starting Hindi processing for: {input_pdf_path}")
-    
-    input_path = pathlib.Path(input_pdf_path)
-    if not input_path.exists():
-        msg = f"Input file not found: {input_pdf_path}"
-        logger.error(msg)
-        raise FileNotFoundError(msg)
-
-    # Prepare raw output folder
-    output_path = pathlib.Path(output_json_path)
-    output_parent = output_path.parent
-    raw_folder_name = output_parent.name + "_raw"
-    raw_folder = output_parent.parent / raw_folder_name
-    raw_folder.mkdir(exist_ok=True, parents=True)
-
-    # Initialize API
-    import google.generativeai as genai
-    utils.configure_genai()
-
-    logger.info("Uploading file...")
-    print("Uploading file...")
-    try:
-        uploaded_file = genai.upload_file(path=input_path, display_name=input_path.name)
-        logger.info(f"File uploaded: {uploaded_file.uri}")
-    except Exception as e:
-        logger.error(f"Upload failed: {e}")
-        raise
-
-    logger.info("Generating content...")
-    print("Generating content...")
-    prompt_parts = generate_extraction_prompt(uploaded_file.uri)
-    model = utils.get_generative_model(model_name="models/gemini-3-flash-preview")
-    
-    response = utils.generate_content_with_retry(model, prompt_parts, logger=logger)
-
-    if not response:
-        logger.error("API call failed after retries")
-        try: genai.delete_file(uploaded_file.name)
-        except: pass
-        return
-
-    # Save raw response IMMEDIATELY
-    raw_path = raw_folder / f"{input_path.stem}_raw.txt"
-    try:
-        with open(raw_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
-        logger.info(f"Raw API response saved to: {raw_path}")
-    except Exception as e:
-        logger.error(f"Failed to save raw response: {e}")
-        raise
-
-    logger.info("Parsing response...")
-    print("Parsing response...")
-    try:
-        cleaned_json = utils.clean_json_response(response.text)
-        data = json.loads(cleaned_json)
-        
-        output_path.parent.mkdir(exist_ok=True, parents=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-            
-        logger.info(f"Saved extracted data to {output_json_path}")
-        print(f"✅ Saved to {output_json_path}")
-    except Exception as e:
-        logger.error(f"Error parsing/saving: {e}")
-        logger.info(f"Raw response is preserved at {raw_path}")
-        print(f"❌ Error: {e}")
-        raise
-    
-    try:
-        genai.delete_file(uploaded_file.name)
-        logger.info("Deleted uploaded file from API")
-    except: 
-        pass
-
-    elapsed = time.time() - start_time
-    logger.info(f"Time: {elapsed:.2f}s")
-    print(f"⏱️  Time: {elapsed:.2f}s")
+def process_question_paper(input_pdf_path: str, output_json_path: str, stream: bool = False, compact: bool = False,
+                           structured: bool = False, sections: bool = False):
+    """
+    Synchronous entry point; runs the shared async extraction engine for one paper.
+    With `sections`, Section A and Section B are extracted concurrently (async_engine.extract_sections).
+    """
+    generation_config = None
+    if structured:
+        generation_config = response_schemas.extraction_config(QUESTION_TYPES, omit=MIRRORED_FIELDS.values(),
+                                                               compact=compact)
+    extract = async_engine.extract_sections if sections else async_engine.extract_paper
+    return asyncio.run(extract(
+        input_pdf_path, output_json_path, generate_extraction_prompt, logger, stream=stream, compact=compact,
+        generation_config=generation_config, mirrored_fields=MIRRORED_FIELDS
+    ))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("input_pdf")
     parser.add_argument("output_json")
+    parser.add_argument("--stream", action="store_true", help="Write questions as they arrive")
     args = parser.parse_args()
-    process_question_paper(args.input_pdf, args.output_json)
+    process_question_paper(args.input_pdf, args.output_json, stream=args.stream)
@@ -1,21 +1,23 @@
-﻿import os
-import json
-import argparse
-import pathlib
+﻿import pathlib
 import textwrap
-import time
+import asyncio
 from dotenv import load_dotenv
 import utils
+import async_engine
+import response_schemas
+import wire_schema
 
 # --- Configuration ---
 load_dotenv()
+# The `type` values the prompt allows (the enum of the structured-output schema)
+QUESTION_TYPES = ["objective", "short_answer", "long_answer"]
 
 # Setup logger
 logger = utils.setup_logger('process_paper', 'logs/process_paper.log')
 
 # --- Core Functions ---
 
-def generate_extraction_prompt(uploaded_file_uri: str) -> list:
+def generate_extraction_prompt(uploaded_file_uri: str, compact: bool = False) -> list:
     prompt = textwrap.dedent("""
     Your task is to act as an expert data extraction engine. You will receive a PDF file of a Class 10 Bihar Board question paper. You must meticulously extract all questions and convert them into a single, clean JSON array.
 
@@ -48,6 +50,8 @@ def generate_extraction_prompt(uploaded_file_uri: str) -> list:
 
     The PDF file is provided. Begin processing now and generate only the JSON array as your output.
     """)
+    if compact:
+        prompt += wire_schema.prompt_section()
 
     return [
         {'text': prompt},
@@ -57,94 +61,19 @@ def generate_extraction_prompt(uploaded_file_uri: str) -> list:
         }}
     ]
 
-def process_question_paper(input_pdf_path: str, output_json_path: str):
-    start_time = time.time()
-    logger.info(f"Starting processing for: {input_pdf_path}")
-    print(f"Starting processing for: {input_pdf_path}") # Keep minimal console feedback
-    
-    input_path = pathlib.Path(input_pdf_path)
-
-    if not input_path.exists():
-        logger.error(f"Input file not found at: {input_pdf_path}")
-        raise FileNotFoundError(f"Input file not found at: {input_pdf_path}")
-
-    # Prepare raw output folder
-    output_path = pathlib.Path(output_json_path)
-    output_parent = output_path.parent
-    raw_folder_name = output_parent.name + "_raw"
-    raw_folder = output_parent.parent / raw_folder_name
-    raw_folder.mkdir(exist_ok=True)
-    
-    # Initialize API
-    import google.generativeai as genai # local import to avoid potential circular issues if moved to utils mostly
-    utils.configure_genai()
-
-    logger.info("Uploading file to the File API...")
-    try:
-        uploaded_file = genai.upload_file(path=input_path, display_name=input_path.name)
-        logger.info(f"File uploaded successfully: {uploaded_file.uri}")
-    except Exception as e:
-        logger.error(f"Failed to upload file: {e}")
-        raise
-
-    prompt_parts = generate_extraction_prompt(uploaded_file.uri)
-
-    logger.info("Generating content with Gemini...")
-    model = utils.get_generative_model(model_name="models/gemini-3-flash-preview")
-    
-    response = utils.generate_content_with_retry(model, prompt_parts, logger=logger)
-                
-    if not response:
-        logger.error("Skipping this file due to API failure.")
-        try:
-            genai.delete_file(uploaded_file.name)
-        except:
-            pass
-        raise Exception("API call failed after retries")
-
-    # Save raw response IMMEDIATELY
-    raw_path = raw_folder / f"{input_path.stem}_raw.txt"
-    with open(raw_path, 'w', encoding='utf-8') as f:
-        f.write(response.text)
-    logger.info(f"Raw API response saved to: {raw_path}")
-
-    logger.info("Cleaning and parsing the JSON response...")
-    try:
-        cleaned_json_string = utils.clean_json_response(response.text)
-        data = json.loads(cleaned_json_string)
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to decode JSON: {e}")
-        logger.error(f"Raw response is preserved in: {raw_path}")
-        try:
-            genai.delete_file(uploaded_file.name)
-        except:
-            pass
-        return
-    except Exception as e:
-        logger.error(f"An unexpected error occurred: {e}")
-        try:
-            genai.delete_file(uploaded_file.name)
-        except:
-            pass
-        return
-
-    logger.info(f"Writing structured data to: {output_path}")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
-    logger.info("Processing complete!")
-    print(f"✅ Processed {input_path.name}") 
-    
-    try:
-        logger.info(f"Deleting file {uploaded_file.name} from the API...")
-        genai.delete_file(uploaded_file.name)
-        logger.info("File deleted.")
-    except Exception as e:
-        logger.warning(f"Could not delete file: {e}")
-    
-    end_time = time.time()
-    execution_time = end_time - start_time
-    logger.info(f"Time: {execution_time:.2f} seconds ({execution_time/60:.2f} minutes)")
+def process_question_paper(input_pdf_path: str, output_json_path: str, stream: bool = False, compact: bool = False,
+                           structured: bool = False, sections: bool = False):
+    """
+    Synchronous entry point; runs the shared async extraction engine for one paper.
+    With `sections`, Section A and Section B are extracted concurrently (async_engine.extract_sections).
+    """
+    generation_config = (response_schemas.extraction_config(QUESTION_TYPES, compact=compact)
+                         if structured else None)
+    extract = async_engine.extract_sections if sections else async_engine.extract_paper
+    return asyncio.run(extract(
+        input_pdf_path, output_json_path, generate_extraction_prompt, logger, stream=stream, compact=compact,
+        generation_config=generation_config
+    ))
 
 
 # --- Interactive Interface ---
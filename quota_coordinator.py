@@ -0,0 +1,185 @@
+"""
+Cross-process quota coordinator.
+
+Lets the six batch_processing_* / batch_annotate_* scripts (or any mix of them) run
+at the same time against one GOOGLE_API_KEY. The adaptive limiter state from
+rate_limiter.py (token bucket, AIMD window, cooldown) is kept in a small JSON file
+guarded by a lock file, and every in-flight request holds a lease in it:
+
+    .pipeline/quota.json   shared limiter state + active leases
+    .pipeline/quota.lock   OS-level lock (fcntl on Linux/macOS, msvcrt on Windows)
+
+A lease whose process has died (or that outlives LEASE_TTL) is reclaimed, so a
+crashed script cannot leak slots.
+
+Usage:
+    python quota_coordinator.py          # show shared limiter state and active leases
+    python quota_coordinator.py reset    # clear state (e.g. after changing GEMINI_RPM)
+"""
+import asyncio
+import contextlib
+import json
+import os
+import pathlib
+import sys
+import time
+from rate_limiter import AdaptiveRateLimiter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEASE_TTL = 30 * 60  # seconds; longer than any single generate_content call
+
+# Limiter attributes persisted in the shared state file
+SHARED_FIELDS = ("rate", "concurrency", "tokens", "_last_refill", "cooldown_until", "last_decrease", "avg_latency")
+
+
+@contextlib.contextmanager
+def file_lock(lock_path: pathlib.Path):
+    """Exclusive, blocking, cross-process lock on `lock_path`."""
+    with open(lock_path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # no cheap check without extra deps; rely on LEASE_TTL
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CrossProcessRateLimiter(AdaptiveRateLimiter):
+    """AdaptiveRateLimiter whose state and in-flight leases are shared between processes."""
+
+    def __init__(self, state_dir: str = ".pipeline", **kwargs):
+        self.state_dir = pathlib.Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.state_dir / "quota.json"
+        self.lock_path = self.state_dir / "quota.lock"
+        self.leases = {}
+        self._lease_seq = 0
+        super().__init__(**kwargs)
+
+    def _clock(self) -> float:
+        # Wall clock: monotonic clocks are not comparable across processes
+        return time.time()
+
+    @contextlib.contextmanager
+    def _shared_state(self):
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            yield
+            self._save()
+
+    def _load(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        limiter = state.get("limiter", {})
+        for field in SHARED_FIELDS:
+            if field in limiter:
+                setattr(self, field, limiter[field])
+        # The ceilings come from this process's configuration
+        self.rate = min(self.rate, self.max_rate)
+        self.concurrency = min(self.concurrency, float(self.max_concurrency))
+
+        now = self._clock()
+        self.leases = {
+            lease_id: lease for lease_id, lease in state.get("leases", {}).items()
+            if lease["expires"] > now and _pid_alive(lease["pid"])
+        }
+        self.in_flight = len(self.leases)
+
+    def _save(self):
+        state = {
+            "limiter": {field: getattr(self, field) for field in SHARED_FIELDS},
+            "leases": self.leases,
+        }
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+    def try_acquire(self) -> float:
+        with self._shared_state():
+            wait = super().try_acquire()
+            if wait <= 0:
+                self._lease_seq += 1
+                self.leases[f"{os.getpid()}:{self._lease_seq}"] = {
+                    "pid": os.getpid(),
+                    "acquired": self._clock(),
+                    "expires": self._clock() + LEASE_TTL,
+                }
+            return wait
+
+    def release(self, latency: float = None, throttled: bool = False):
+        with self._shared_state():
+            own = [lease_id for lease_id, lease in self.leases.items() if lease["pid"] == os.getpid()]
+            if own:
+                del self.leases[own[0]]
+            super().release(latency=latency, throttled=throttled)
+
+    # The shared state sits behind a blocking file lock and file I/O: a slow lock holder in
+    # another process must not stall every stream on this event loop, so the async paths
+    # take it on a worker thread
+    async def _try_acquire_async(self) -> float:
+        return await asyncio.to_thread(self.try_acquire)
+
+    async def release_async(self, latency: float = None, throttled: bool = False):
+        await asyncio.to_thread(self.release, latency, throttled)
+
+
+def main():
+    state_dir = pathlib.Path(os.environ.get("GEMINI_QUOTA_DIR", ".pipeline"))
+    state_path = state_dir / "quota.json"
+
+    if len(sys.argv) > 1 and sys.argv[1] == "reset":
+        with file_lock(state_dir / "quota.lock"):
+            state_path.unlink(missing_ok=True)
+        print(f"🧹 Cleared shared quota state in {state_dir}/")
+        return
+
+    if not state_path.exists():
+        print("No shared quota state yet.")
+        return
+
+    state = json.loads(state_path.read_text(encoding="utf-8"))
+    limiter = state.get("limiter", {})
+    now = time.time()
+    print(f"📊 Shared limiter: {int(limiter.get('concurrency', 0))} concurrent, "
+          f"{limiter.get('rate', 0) * 60:.0f} req/min")
+    if limiter.get("cooldown_until", 0) > now:
+        print(f"⏳ Cooling down for {limiter['cooldown_until'] - now:.1f}s after a 429")
+    leases = state.get("leases", {})
+    print(f"🔒 Active leases: {len(leases)}")
+    for lease_id, lease in sorted(leases.items()):
+        print(f"   - {lease_id}: held {now - lease['acquired']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Shared adaptive rate limiter for Gemini calls.
+
+Every caller of `utils.generate_content_with_retry` (sync or async) takes a slot
+from one limiter per process. The limiter combines:
+
+- a token bucket that spaces request starts at the current rate, so callers that
+  were throttled together are released one by one instead of all at once, and
+- an AIMD concurrency window: each success adds roughly one slot per window,
+  a 429 halves both the window and the rate (at most once per cooldown).
+
+Configure with GEMINI_RPM and GEMINI_MAX_CONCURRENCY in `.env`. By default the
+limiter state is shared by every pipeline process on the machine through
+quota_coordinator.py, so those limits apply to the API key as a whole.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+DEFAULT_RPM = 60
+DEFAULT_MAX_CONCURRENCY = 16
+THROTTLE_COOLDOWN = 10.0  # seconds of silence after a 429
+
+
+def is_rate_limit_error(error) -> bool:
+    error_str = str(error)
+    return "429" in error_str or "Resource has been exhausted" in error_str
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, max_rpm: float = DEFAULT_RPM, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 min_rpm: float = 2, min_concurrency: int = 1):
+        self.max_rate = max_rpm / 60.0
+        self.min_rate = min_rpm / 60.0
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+
+        # Start at the configured rate with half the window and let AIMD find the ceiling
+        self.rate = self.max_rate
+        self.concurrency = float(max(min_concurrency, max_concurrency // 2))
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.last_decrease = 0.0
+        self.avg_latency = None
+        self._last_refill = self._clock()
+        self._lock = threading.RLock()
+
+    def _clock(self) -> float:
+        return time.monotonic()
+
+    # --- Acquire ---
+
+    def _refill(self, now: float):
+        burst = max(1.0, self.concurrency)
+        self.tokens = min(burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self) -> float:
+        """Takes a slot if one is free. Returns 0 on success, otherwise seconds to wait."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if now < self.cooldown_until:
+                return self.cooldown_until - now + random.uniform(0, 1 / self.rate)
+            if self.in_flight >= int(self.concurrency):
+                return 0.25
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / self.rate
+            self.tokens -= 1.0
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self):
+        """Blocks the calling thread until a slot is available."""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Waits on the event loop until a slot is available."""
+        while True:
+            wait = await self._try_acquire_async()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _try_acquire_async(self) -> float:
+        # In-memory and cheap; subclasses with blocking state (quota_coordinator.py) run it off the loop
+        return self.try_acquire()
+
+    # --- Release / feedback ---
+
+    def release(self, latency: float = None, throttled: bool = False):
+        """Returns a slot and feeds the outcome of the request back into AIMD."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = self._clock()
+            if throttled:
+                self._decrease(now)
+            elif latency is not None:
+                self._increase(latency)
+
+    async def release_async(self, latency: float = None, throttled: bool = False):
+        """`release` for coroutines."""
+        self.release(latency=latency, throttled=throttled)
+
+    def _decrease(self, now: float):
+        # Only back off once per congestion event
+        self.cooldown_until = max(self.cooldown_until, now + THROTTLE_COOLDOWN)
+        if now - self.last_decrease < THROTTLE_COOLDOWN:
+            return
+        self.last_decrease = now
+        self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+
+    def _increase(self, latency: float):
+        # Hold steady while latency is climbing: the backend is queueing us
+        if self.avg_latency is not None and latency > 2 * self.avg_latency:
+            self.avg_latency = 0.8 * self.avg_latency + 0.2 * latency
+            return
+        self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+        self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+        self.rate = min(self.max_rate, self.rate + self.max_rate / (10 * max(1.0, self.concurrency)))
+
+    def status(self) -> str:
+        return f"{int(self.concurrency)} concurrent, {self.rate * 60:.0f} req/min"
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Returns the process-wide limiter, configured from the environment.
+
+    Unless GEMINI_SHARED_QUOTA=0, this is a CrossProcessRateLimiter whose state lives
+    in GEMINI_QUOTA_DIR (default `.pipeline/`), shared with every other pipeline process.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            kwargs = dict(
+                max_rpm=float(os.environ.get("GEMINI_RPM", DEFAULT_RPM)),
+                max_concurrency=int(os.environ.get("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            )
+            if os.environ.get("GEMINI_SHARED_QUOTA", "1") != "0":
+                from quota_coordinator import CrossProcessRateLimiter
+                _shared_limiter = CrossProcessRateLimiter(
+                    state_dir=os.environ.get("GEMINI_QUOTA_DIR", ".pipeline"), **kwargs
+                )
+            else:
+                _shared_limiter = AdaptiveRateLimiter(**kwargs)
+        return _shared_limiter
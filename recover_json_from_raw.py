@@ -1,9 +1,25 @@
 import json
 import pathlib
 import sys
+import json_repair
+import continuation
+import job_store
+from subjects import NAMES as SUBJECT_NAMES, SUBJECTS
+import response_schemas
 import utils
+import wire_schema
 
-def recover_subject(subject):
+def salvage_raw(raw_path):
+    """Complete questions of a truncated raw response, plus any continuation files next to it."""
+    data, _ = continuation.salvage_questions(raw_path.read_text(encoding='utf-8'))
+    for cont_path in sorted(raw_path.parent.glob(f"{raw_path.stem}.cont*.txt")):
+        more, _ = continuation.salvage_questions(cont_path.read_text(encoding='utf-8'))
+        data = continuation.stitch(data, more)
+    if not data:
+        raise ValueError("no complete question objects")
+    return data
+
+def recover_subject(subject, salvage=False):
     raw_folder = pathlib.Path(f"{subject}_data_raw")
     out_folder = pathlib.Path(f"{subject}_data")
     
@@ -12,6 +28,8 @@ def recover_subject(subject):
         return
 
     out_folder.mkdir(exist_ok=True)
+    mirrored = SUBJECTS[subject].mirrored_fields if subject in SUBJECTS else {}
+    jobs = job_store.get_job_store()
     raw_files = list(raw_folder.glob("*_raw.txt"))
     
     print(f"🔍 Checking {len(raw_files)} raw files for {subject}...")
@@ -24,8 +42,9 @@ def recover_subject(subject):
         # standard mapping: soc_2023i_raw.txt -> soc_2023i.json
         json_name = raw_path.name.replace("_raw.txt", ".json")
         out_path = out_folder / json_name
+        paper = job_store.paper_key(out_path)
         
-        if out_path.exists():
+        if jobs.is_done(paper, "extract", out_path):
             skipped += 1
             continue
             
@@ -35,12 +54,23 @@ def recover_subject(subject):
             with open(raw_path, 'r', encoding='utf-8') as f:
                 raw_text = f.read()
             
-            # Use the new robust cleaning logic from utils.py
-            cleaned_text = utils.clean_json_response(raw_text)
-            data = json.loads(cleaned_text)
+            # Single-pass repair engine (json_repair.py)
+            try:
+                data = json_repair.loads(raw_text)
+            except json.JSONDecodeError:
+                if not salvage:
+                    raise
+                # Truncated output: keep the questions that did arrive
+                data = salvage_raw(raw_path)
+                print(f"✂️ salvaged {len(data)} questions", end=" ")
+            if isinstance(data, list):
+                # Raw responses of --compact runs use short keys and --structured runs labelled
+                # sub-question lists; full-schema objects pass through both
+                data = response_schemas.decode(wire_schema.decode(data))
+                data = utils.expand_mirrored_fields(data, mirrored)
             
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            utils.atomic_write_json(out_path, data)
+            jobs.finish(paper, "extract", out_path)
             
             print("✅ DONE")
             recovered += 1
@@ -54,12 +84,16 @@ def recover_subject(subject):
     print(f"   Failed: {failed}")
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        subjects = sys.argv[1:]
+    # --salvage: write the complete questions of truncated responses instead of failing them
+    args = sys.argv[1:]
+    salvage = "--salvage" in args
+    args = [a for a in args if a != "--salvage"]
+    if args:
+        subjects = args
     else:
         # Default to all known subjects if none specified
-        subjects = ['science', 'mathematics', 'social_science', 'hindi', 'english', 'sanskrit']
+        subjects = list(SUBJECT_NAMES)
     
     for sub in subjects:
-        recover_subject(sub)
+        recover_subject(sub, salvage=salvage)
         print("-" * 30)
@@ -0,0 +1,155 @@
+"""
+Precomputed "related questions" for every question of a subject.
+
+Runs after the merge: every question in `{subject}_pro/{subject}_all_years.json`
+becomes a TF-IDF row (textnorm tokens of the question, passage, sub-questions and
+options), and its top-k cosine neighbours from other years are computed one row
+at a time against the inverted index (the transpose of the TF-IDF matrix), so a
+row only touches the questions it shares a term with and memory stays at one
+accumulator. Terms that occur in a single question cannot relate two questions
+and are dropped before scoring.
+
+The result sits next to the merged file as two sidecars:
+
+    {subject}_pro/{subject}_related.bin        header + int32 neighbour rows + float32 scores, n x k
+    {subject}_pro/{subject}_related_keys.json  [[year, index in year, id], ...] for every row
+
+so serving is an O(1) slice of a memory-mapped array:
+
+    related = RelatedQuestions(subjects.get("science"))
+    related.lookup("2018", 4)   # [(year, index, id, score), ...] for all_years["2018"][4]
+
+Usage:
+    python related_questions.py                 # all subjects
+    python related_questions.py science -k 20
+"""
+import argparse
+import heapq
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+import corpus
+import dedup_index
+import subjects
+import textnorm
+
+DEFAULT_K = 10
+_MAGIC = b"RQ01"
+_HEADER = struct.Struct("<4sII")  # magic, rows, k
+
+
+def question_vectors(data: dict):
+    """`(keys, rows)`: `[year, index, id]` and a normalized `{term: tf-idf}` for every question."""
+    keys = []
+    counts = []
+    for year, items in corpus.order_years(data).items():
+        if not isinstance(items, list):
+            continue
+        for index, item in enumerate(items):
+            if isinstance(item, dict):
+                keys.append([year, index, str(item.get("id"))])
+                counts.append(Counter(textnorm.tokens(dedup_index.question_text(item))))
+
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    n = len(counts)
+    rows = []
+    for c in counts:
+        # Terms in a single question have no neighbour to match
+        weights = {t: (1 + math.log(tf)) * math.log(n / df[t]) for t, tf in c.items() if df[t] > 1}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        rows.append({t: w / norm for t, w in weights.items()} if norm else {})
+    return keys, rows
+
+
+def top_k_neighbours(keys: list, rows: list, k: int = DEFAULT_K):
+    """
+    For every row, the `k` most similar rows from another year.
+
+    Returns:
+        (neighbour rows, scores) as flat arrays of `len(rows) * k`, padded with -1 / 0.0.
+    """
+    postings = {}
+    for j, row in enumerate(rows):
+        for t, w in row.items():
+            postings.setdefault(t, []).append((j, w))
+
+    neighbours = array("i", [-1]) * (len(rows) * k)
+    scores = array("f", [0.0]) * (len(rows) * k)
+    for i, row in enumerate(rows):
+        acc = {}
+        for t, w in row.items():
+            for j, wj in postings[t]:
+                acc[j] = acc.get(j, 0.0) + w * wj
+        year = keys[i][0]
+        best = heapq.nlargest(k, ((s, j) for j, s in acc.items() if keys[j][0] != year))
+        for rank, (s, j) in enumerate(best):
+            neighbours[i * k + rank] = j
+            scores[i * k + rank] = s
+    return neighbours, scores
+
+
+def write_related(subject, data: dict = None, k: int = DEFAULT_K) -> int:
+    """Builds and writes the subject's sidecars from the merged corpus. Returns the number of rows."""
+    if data is None:
+        data = corpus.load_merged(subject)
+    keys, rows = question_vectors(data)
+    neighbours, scores = top_k_neighbours(keys, rows, k)
+    if sys.byteorder != "little":
+        neighbours.byteswap()
+        scores.byteswap()
+
+    corpus.write_bytes(str(subject.related_path),
+                       _HEADER.pack(_MAGIC, len(rows), k) + neighbours.tobytes() + scores.tobytes())
+    corpus.write_text(str(subject.related_keys_path), json.dumps(keys, ensure_ascii=False))
+    print(f"Wrote {subject.related_path}: top {k} related questions for {len(rows)} questions")
+    return len(rows)
+
+
+class RelatedQuestions:
+    """Memory-mapped lookup over a subject's sidecars."""
+
+    def __init__(self, subject):
+        with open(subject.related_keys_path, "r", encoding="utf-8") as f:
+            self.keys = json.load(f)
+        self.rows = {(year, index): row for row, (year, index, _) in enumerate(self.keys)}
+        with open(subject.related_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, self.k = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC or n != len(self.keys):
+            raise ValueError(f"{subject.related_path} does not match {subject.related_keys_path}; rebuild it")
+        body = memoryview(self._mm)[_HEADER.size:]
+        self._neighbours = body[:n * self.k * 4].cast("i")
+        self._scores = body[n * self.k * 4:].cast("f")
+
+    def neighbours(self, row: int) -> list:
+        """`[(row, score)]` of the row's related questions, most similar first."""
+        start = row * self.k
+        return [(j, s) for j, s in zip(self._neighbours[start:start + self.k], self._scores[start:start + self.k])
+                if j >= 0]
+
+    def lookup(self, year: str, index: int) -> list:
+        """`[(year, index, id, score)]` for `all_years[year][index]`."""
+        return [(*self.keys[j], s) for j, s in self.neighbours(self.rows[(str(year), index)])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-k related questions of every question.")
+    parser.add_argument("subjects", nargs="*", help=f"Subjects to index (default: {' '.join(subjects.NAMES)})")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="Related questions kept per question")
+    args = parser.parse_args()
+
+    for name in args.subjects:
+        if name not in subjects.SUBJECTS:
+            parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+    for name in args.subjects or subjects.NAMES:
+        write_related(subjects.get(name), k=args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Content-addressed disk cache for Gemini responses.
+
+Sits in front of `utils.generate_content_with_retry`. The key is the SHA-256 of the
+model name, the prompt text and the SHA-256 of every source file (the PDF) whose
+upload URI appears in the prompt, so re-running a batch after a parse failure or
+a downstream tweak returns the previous response in milliseconds instead of paying
+for another multi-minute call.
+
+    .pipeline/response_cache/index.sqlite3   key -> size, last access (LRU index)
+    .pipeline/response_cache/ab/abcd....txt  response text
+
+Usage:
+    python response_cache.py seed [subjects...]   # import existing extraction *_raw.txt files
+    python response_cache.py stats
+    python response_cache.py clear
+
+Set GEMINI_CACHE=0 to bypass the cache, GEMINI_CACHE_MAX_MB to bound its size.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import subjects
+
+DEFAULT_ROOT = ".pipeline/response_cache"
+DEFAULT_MAX_MB = 1024
+
+
+class CachedResponse:
+    """Stands in for a GenerateContentResponse served from the cache."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+        self.candidates = []
+        self.from_cache = True
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(model_name: str, prompt_parts, source_files=(), generation_config=None) -> str:
+    """
+    Hashes the model name, the text of the prompt, the contents of `source_files` and the
+    generation config (a structured-output response differs from a free-text one).
+
+    `file_data` parts are skipped: their URI changes on every upload, the file bytes
+    they point at are covered by `source_files` instead.
+    """
+    if isinstance(prompt_parts, (str, dict)):
+        prompt_parts = [prompt_parts]
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8") + b"\0")
+    for part in prompt_parts:
+        if isinstance(part, str):
+            text = part
+        elif isinstance(part, dict) and "file_data" in part:
+            continue
+        else:
+            text = json.dumps(part, ensure_ascii=False, sort_keys=True)
+        h.update(text.encode("utf-8") + b"\0")
+    for path in source_files:
+        h.update(file_sha256(path).encode("ascii") + b"\0")
+    if generation_config:
+        h.update(b"config\0" + json.dumps(generation_config, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def prompt_has_file_data(prompt_parts) -> bool:
+    return isinstance(prompt_parts, list) and any(isinstance(p, dict) and "file_data" in p for p in prompt_parts)
+
+
+class ResponseCache:
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / "index.sqlite3", timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, model TEXT, size INTEGER, created REAL, last_access REAL)"
+        )
+        self._db.commit()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.root / key[:2] / f"{key}.txt"
+
+    def get(self, key: str):
+        """Returns the cached response text, or None on a miss."""
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return text
+
+    def put(self, key: str, text: str, model_name: str = ""):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, model, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, path.stat().st_size, now, now),
+            )
+            self._db.commit()
+        self.evict()
+
+    def evict(self):
+        """Drops least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                self._path(key).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                self._path(key).unlink(missing_ok=True)
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Returns the process-wide cache, or None when disabled with GEMINI_CACHE=0."""
+    global _shared_cache
+    if os.environ.get("GEMINI_CACHE", "1") == "0":
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                root=os.environ.get("GEMINI_CACHE_DIR", DEFAULT_ROOT),
+                max_bytes=int(float(os.environ.get("GEMINI_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            )
+        return _shared_cache
+
+
+# --- Seeding from existing raw responses ---
+
+def seed_subject(cache: ResponseCache, subject_name: str, model_name: str) -> int:
+    """
+    Imports `{subject}_data_raw` extraction responses as cache entries.
+
+    Annotation answers are not seeded here: annotate_paper only sends the questions
+    missing from the annotation cache, so a whole-paper prompt key would never be
+    hit. `python annotation_cache.py seed` imports them per question instead.
+    """
+    seeded = 0
+    subject = subjects.get(subject_name)
+    extraction = subject.extraction()
+    for raw_path in sorted(pathlib.Path(f"{subject.name}_data_raw").glob("*_raw.txt")):
+        stem = raw_path.name.replace("_raw.txt", "")
+        pdf_path = subject.papers_dir / f"{stem}.pdf"
+        if not pdf_path.exists():
+            continue
+        key = cache_key(model_name, extraction.generate_extraction_prompt(""), [pdf_path])
+        cache.put(key, raw_path.read_text(encoding="utf-8"), model_name)
+        seeded += 1
+    return seeded
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = ResponseCache(
+        root=os.environ.get("GEMINI_CACHE_DIR", DEFAULT_ROOT),
+        max_bytes=int(float(os.environ.get("GEMINI_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+    )
+
+    if command == "seed":
+        from async_engine import DEFAULT_MODEL
+        for subject in sys.argv[2:] or subjects.NAMES:
+            print(f"🌱 {subject}: seeded {seed_subject(cache, subject, DEFAULT_MODEL)} entries")
+    elif command == "clear":
+        cache.clear()
+        print("🧹 Cache cleared")
+
+    stats = cache.stats()
+    print(f"📦 {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB of {stats['max_bytes'] / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Response schemas for Gemini's native structured output.
+
+With a generation config from `extraction_config` / `annotation_config`, the API
+is asked for `application/json` constrained to a schema, so the response is
+valid JSON by construction: it parses with one `json.loads`, with no fence
+stripping, comma patching or retries over malformed output. `loads` still falls
+back to json_repair.py for responses that were cached or generated without a
+schema.
+
+The schema language has no open-ended objects, so sub-questions (whose keys vary:
+"A", "1", "i", ...) are requested as `[{"label": ..., "text": ...}]` and the API
+may order properties alphabetically; `decode` restores the extraction schema:
+
+    {"id": "obj_1", "options": {...}, "question": "...", "type": "objective"}
+    -> {"id": "obj_1", "type": "objective", "question": "...", "options": {...}}
+"""
+import json
+import json_repair
+import wire_schema
+
+MIME_TYPE = "application/json"
+
+_TEXT = {"type": "STRING"}
+_OPTIONS = {"type": "OBJECT", "properties": {letter: _TEXT for letter in "ABCD"}, "required": list("ABCD")}
+_OPTION_LIST = {"type": "ARRAY", "items": _TEXT}
+_LABELLED = {
+    "type": "ARRAY",
+    "items": {"type": "OBJECT", "properties": {"label": _TEXT, "text": _TEXT}, "required": ["label", "text"]},
+}
+
+# Extraction fields in the order they are written to disk
+FIELDS = {
+    "id": _TEXT,
+    "type": _TEXT,
+    "question": _TEXT,
+    "prashna": _TEXT,
+    "instructions": _TEXT,
+    "options": _OPTIONS,
+    "vikalpa": _OPTIONS,
+    "context": _TEXT,
+    "sub_questions": _LABELLED,
+    "anuprashna": _LABELLED,
+}
+_LABELLED_FIELDS = {"sub_questions", "anuprashna"}
+
+
+def extraction_schema(types: list, omit=(), compact: bool = False) -> dict:
+    """
+    Array-of-questions schema for a subject.
+
+    Args:
+        types: The question types of the subject's prompt (QUESTION_TYPES of its process_*_paper module).
+        omit: Fields the prompt does not ask for (e.g. MIRRORED_FIELDS mirrors).
+        compact: Use wire_schema.py short keys and option arrays.
+    """
+    short = {name: key for key, name in wire_schema.KEYS.items()}
+    properties = {}
+    for name, schema in FIELDS.items():
+        if name in omit:
+            continue
+        if name == "type":
+            schema = {"type": "STRING", "enum": list(types)}
+        if compact:
+            if schema is _OPTIONS:
+                schema = _OPTION_LIST
+            name = short.get(name, name)
+        properties[name] = schema
+    required = [short.get(f, f) if compact else f for f in ("id", "type")]
+    return {"type": "ARRAY", "items": {"type": "OBJECT", "properties": properties, "required": required}}
+
+
+def extraction_config(types: list, omit=(), compact: bool = False) -> dict:
+    """`generation_config` for a structured extraction call."""
+    return {"response_mime_type": MIME_TYPE, "response_schema": extraction_schema(types, omit, compact)}
+
+
+def annotation_config() -> dict:
+    """`generation_config` for a structured annotation call: `[{"id", "chapter"}]` (see annotation.py)."""
+    return {
+        "response_mime_type": MIME_TYPE,
+        "response_schema": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"id": _TEXT, "chapter": {"type": "INTEGER"}},
+                "required": ["id", "chapter"],
+            },
+        },
+    }
+
+
+def loads(text: str, logger=None):
+    """Parses a structured response; falls back to the repair pass if it is not valid JSON."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        if logger:
+            logger.warning(f"Structured response is not valid JSON ({e}); repairing")
+        return json_repair.loads(text)
+
+
+def _unlabel(value):
+    if isinstance(value, list) and all(isinstance(v, dict) and set(v) == {"label", "text"} for v in value):
+        return {str(v["label"]): v["text"] for v in value}
+    return value
+
+
+def decode_question(question):
+    """Labelled sub-question lists back to objects, fields back in FIELDS order."""
+    if not isinstance(question, dict):
+        return question
+    ordered = {name: question[name] for name in FIELDS if name in question}
+    ordered.update((k, v) for k, v in question.items() if k not in ordered)
+    for name in _LABELLED_FIELDS & ordered.keys():
+        ordered[name] = _unlabel(ordered[name])
+    return ordered
+
+
+def decode(questions: list) -> list:
+    return [decode_question(q) for q in questions]
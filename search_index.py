@@ -0,0 +1,307 @@
+"""
+In-process BM25 search over a subject's merged corpus.
+
+Builds an inverted index over every question of `{subject}_pro/{subject}_all_years.json`
+(question, prashna, options, vikalpa, passage and sub-questions) and serializes it
+to one array-backed file that is memory-mapped on open, so nothing is parsed or
+loaded up front: a term is found by binary search over the sorted term table and
+its postings are read straight from the mapping. Opening takes well under a
+millisecond, which keeps CLI tools and serverless handlers fast without a database.
+
+Text goes through textnorm.normalize (NFC, nukta/chandrabindu folding), which keeps
+Devanagari vowel signs inside their word; Hindi/Sanskrit words then lose common
+inflectional suffixes and English words a light plural/-ing/-ed stemmer.
+
+Every Devanagari word is also indexed under its romanized stem ("~" + the
+transliterate.py key of the word, stripped of its inflection), computed once at
+build time. A Latin query word is looked up both as English and as a romanized stem
+built the same way, so "prakash ka paravartan" and "प्रकाश का परावर्तन" are served
+from the same postings.
+
+    index = SearchIndex(subjects.get("science").search_index_path)
+    index.search("ohm's law")   # [(score, year, index in year, id), ...]
+
+Usage:
+    python search_index.py build [subjects...]
+    python search_index.py search "refraction of light" --subject science
+    python search_index.py check [--subject hindi]     # romanized queries match Devanagari ones
+"""
+import argparse
+import bisect
+import heapq
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+import chapter_classifier
+import corpus
+import subjects
+import textnorm
+import transliterate
+
+K1 = 1.2
+B = 0.75
+_MAGIC = b"BM03"
+# magic, docs, terms, postings, avg doc length, term blob size, key blob size
+_HEADER = struct.Struct("<4sIIIfII")
+
+# Light stemmer suffixes (Ramanathan & Rao); chandrabindu is already folded to anusvara by textnorm
+_DEVANAGARI_SUFFIXES = sorted("""
+    ाएंगी ाएंगे ाऊंगी ाऊंगा ाइयां ाइयों
+    ाएगी ाएगा ाओगी ाओगे एंगी ेंगी एंगे ेंगे ूंगी ूंगा ातीं नाओं नाएं ताओं ताएं ियां ियों
+    ाकर ाइए ाईं ाया ेगी ेगा ोगी ोगे ाने ाना ाते ाती ाता तीं ाओं ाएं ुओं ुएं ुआं
+    कर ाओ िए ाई ाए ने नी ना ते ीं ती ता ां ों ें
+    ो े ू ु ी ि ा
+""".split(), key=len, reverse=True)
+
+
+def stem_devanagari(word: str) -> str:
+    for suffix in _DEVANAGARI_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+
+def stem_english(word: str) -> str:
+    if len(word) <= 3 or not word.isascii() or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        stem = word[:-len(suffix)]
+        if word.endswith(suffix) and len(stem) >= 3 and any(v in stem for v in "aeiouy"):
+            if len(stem) > 3 and stem[-1] == stem[-2] and stem[-1] not in "lsz":
+                stem = stem[:-1]  # running -> run
+            return stem
+    return word
+
+
+ROMAN_PREFIX = "~"
+
+
+def analyze(text: str) -> list:
+    """Index terms of `text`: stemmed words, plus the romanized stem of every Devanagari word."""
+    terms = []
+    for t in textnorm.tokens(text):
+        if t.isascii():
+            terms.append(stem_english(t))
+        else:
+            terms.append(stem_devanagari(t))
+            terms.append(ROMAN_PREFIX + transliterate.stem(transliterate.devanagari_key(t)))
+    return terms
+
+
+def analyze_query(query: str) -> list:
+    """
+    Query terms: Devanagari words as indexed; Latin words as English and as romanized Hindi.
+
+    Both sides take the romanized stem of the whole word (transliterate.stem over its
+    key), so "pani" and पानी, or "bachchon" and बच्चे, reduce to the same term.
+    """
+    terms = []
+    for t in textnorm.tokens(query):
+        if t.isascii():
+            terms.append(stem_english(t))
+            if not t.isdigit():
+                terms.append(ROMAN_PREFIX + transliterate.stem(transliterate.key(t)))
+        else:
+            terms.append(stem_devanagari(t))
+    return terms
+
+
+def build(data: dict) -> bytes:
+    """Serializes the index of a merged `{year: [items]}` corpus."""
+    keys = []
+    doc_terms = []
+    for year, items in corpus.order_years(data).items():
+        if not isinstance(items, list):
+            continue
+        for index, item in enumerate(items):
+            if isinstance(item, dict):
+                keys.append(json.dumps([year, index, str(item.get("id"))], ensure_ascii=False))
+                doc_terms.append(Counter(analyze(chapter_classifier.question_text(item))))
+
+    postings = {}
+    for doc, counts in enumerate(doc_terms):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc, tf))
+    terms = sorted(postings)
+
+    doc_len = array("I", (sum(c.values()) for c in doc_terms))
+    term_offsets, term_blob = array("I", [0]), bytearray()
+    post_offsets, post_docs, post_tf = array("I", [0]), array("I"), array("I")
+    for term in terms:
+        term_blob += term.encode("utf-8")
+        term_offsets.append(len(term_blob))
+        for doc, tf in postings[term]:
+            post_docs.append(doc)
+            post_tf.append(tf)
+        post_offsets.append(len(post_docs))
+    key_offsets, key_blob = array("I", [0]), bytearray()
+    for key in keys:
+        key_blob += key.encode("utf-8")
+        key_offsets.append(len(key_blob))
+
+    arrays = [doc_len, term_offsets, post_offsets, post_docs, post_tf, key_offsets]
+    if sys.byteorder != "little":
+        for a in arrays:
+            a.byteswap()
+    avgdl = sum(doc_len) / len(doc_len) if doc_len else 0.0
+    header = _HEADER.pack(_MAGIC, len(keys), len(terms), len(post_docs), avgdl, len(term_blob), len(key_blob))
+    return header + b"".join(a.tobytes() for a in arrays) + bytes(term_blob) + bytes(key_blob)
+
+
+def write_index(subject, data: dict = None) -> None:
+    """Builds `{subject}_pro/{subject}_search.bin` from the merged corpus."""
+    if data is None:
+        data = corpus.load_merged(subject)
+    payload = build(data)
+    corpus.write_bytes(str(subject.search_index_path), payload)
+    print(f"Wrote {subject.search_index_path}: {_HEADER.unpack_from(payload)[2]} terms "
+          f"over {_HEADER.unpack_from(payload)[1]} questions")
+
+
+class SearchIndex:
+    """Memory-mapped BM25 index written by `write_index`."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.docs, self.terms, postings, self.avgdl, term_bytes, key_bytes = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a search index of this version; rebuild it with search_index.py build")
+
+        view = memoryview(self._mm)
+        pos = _HEADER.size
+
+        def take(count: int, fmt: str = "I"):
+            nonlocal pos
+            part = view[pos:pos + count * 4].cast(fmt)
+            pos += count * 4
+            return part
+
+        self._doc_len = take(self.docs)
+        self._term_offsets = take(self.terms + 1)
+        self._post_offsets = take(self.terms + 1)
+        self._post_docs = take(postings)
+        self._post_tf = take(postings)
+        self._key_offsets = take(self.docs + 1)
+        self._term_blob = view[pos:pos + term_bytes]
+        self._key_blob = view[pos + term_bytes:pos + term_bytes + key_bytes]
+
+    def _term(self, i: int) -> str:
+        return bytes(self._term_blob[self._term_offsets[i]:self._term_offsets[i + 1]]).decode("utf-8")
+
+    def _find(self, term: str) -> int:
+        """Index of `term` in the sorted term table, or -1."""
+        i = bisect.bisect_left(_TermTable(self), term)
+        return i if i < self.terms and self._term(i) == term else -1
+
+    def key(self, doc: int) -> list:
+        """`[year, index in year, id]` of a document."""
+        return json.loads(bytes(self._key_blob[self._key_offsets[doc]:self._key_offsets[doc + 1]]).decode("utf-8"))
+
+    def search(self, query: str, k: int = 10) -> list:
+        """`[(score, year, index in year, id)]` of the best `k` questions for `query`."""
+        scores = {}
+        for term in set(analyze_query(query)):
+            i = self._find(term)
+            if i < 0:
+                continue
+            start, end = self._post_offsets[i], self._post_offsets[i + 1]
+            idf = math.log(1 + (self.docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            for doc, tf in zip(self._post_docs[start:end], self._post_tf[start:end]):
+                norm = K1 * (1 - B + B * self._doc_len[doc] / self.avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return [(score, *self.key(doc)) for doc, score in heapq.nlargest(k, scores.items(), key=lambda x: x[1])]
+
+
+# Common words as students type them; `check` verifies each is keyed like its Devanagari spelling
+ROMANIZED_WORDS = {
+    "पानी": "pani", "हिंदी": "hindi", "लड़की": "ladki", "लड़के": "ladke", "बच्चों": "bachchon",
+    "बच्चे": "bachche", "कविता": "kavita", "कविताओं": "kavitaon", "कहानी": "kahani", "लेखक": "lekhak",
+    "भारत": "bharat", "प्रकाश": "prakash", "परावर्तन": "paravartan", "शिक्षा": "shiksha", "नदी": "nadi",
+}
+
+
+def check_romanized(index: "SearchIndex" = None) -> list:
+    """
+    Regression check that a romanized query is keyed like the Devanagari word, and with
+    `index`, that it finds the questions the Devanagari query finds. Returns the failures.
+    """
+    failures = []
+    for devanagari, roman in ROMANIZED_WORDS.items():
+        indexed = {t for t in analyze(devanagari) if t.startswith(ROMAN_PREFIX)}
+        queried = {t for t in analyze_query(roman) if t.startswith(ROMAN_PREFIX)}
+        if not indexed & queried:
+            failures.append(f"{roman!r} is keyed {sorted(queried)}, {devanagari} is indexed as {sorted(indexed)}")
+        elif index is not None:
+            native = {tuple(r[1:]) for r in index.search(devanagari, index.docs)}
+            romanized = {tuple(r[1:]) for r in index.search(roman, index.docs)}
+            if native and not romanized:
+                failures.append(f"{roman!r} finds nothing, {devanagari} finds {len(native)} questions")
+    return failures
+
+
+class _TermTable:
+    """Sequence view of the sorted term table, for bisect."""
+
+    def __init__(self, index: SearchIndex):
+        self.index = index
+
+    def __len__(self):
+        return self.index.terms
+
+    def __getitem__(self, i: int) -> str:
+        return self.index._term(i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the BM25 search index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Build the index of each subject's merged corpus")
+    build_parser.add_argument("subjects", nargs="*", help=f"default: {' '.join(subjects.NAMES)}")
+    search_parser = commands.add_parser("search", help="Search one subject")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--subject", choices=subjects.NAMES, required=True)
+    search_parser.add_argument("-k", type=int, default=10)
+    check_parser = commands.add_parser("check", help="Check that romanized queries match their Devanagari spelling")
+    check_parser.add_argument("--subject", choices=subjects.NAMES, help="Also compare hits on this subject's index")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        index = SearchIndex(subjects.get(args.subject).search_index_path) if args.subject else None
+        failures = check_romanized(index)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"✅ {len(ROMANIZED_WORDS)} romanized words match their Devanagari spelling")
+        return
+
+    if args.command == "build":
+        for name in args.subjects:
+            if name not in subjects.SUBJECTS:
+                parser.error(f"unknown subject {name!r}; expected one of {', '.join(subjects.NAMES)}")
+        for name in args.subjects or subjects.NAMES:
+            write_index(subjects.get(name))
+        return
+
+    subject = subjects.get(args.subject)
+    index = SearchIndex(subject.search_index_path)
+    data = corpus.load_merged(subject)
+    for score, year, position, qid in index.search(args.query, args.k):
+        item = data[year][position]
+        text = str(item.get("question") or item.get("prashna") or "").replace("\n", " ")
+        print(f"{score:6.2f}  {year} {qid:<12} {text[:140]}")
+
+
+if __name__ == "__main__":
+    main()
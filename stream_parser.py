@@ -0,0 +1,81 @@
+"""
+Incremental parser for a streamed JSON array of question objects.
+
+Feed it chunks of model output as they arrive; every time a top-level object in the
+array is closed it is parsed and returned, so questions can be written out while the
+rest of the paper is still being generated. Markdown fences or prose before the
+opening `[` are skipped.
+
+    parser = IncrementalQuestionParser()
+    for chunk in stream:
+        for question in parser.feed(chunk.text):
+            ...
+"""
+import json
+import json_repair
+
+
+class IncrementalQuestionParser:
+    def __init__(self):
+        self.questions = []
+        self.failed = 0          # objects that closed but could not be parsed
+        self.closed = False      # top-level array closed
+        self._buffer = []        # text of the object being read
+        self._started = False    # seen the opening '['
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> list:
+        """Consumes a chunk of text and returns the questions it completed."""
+        completed = []
+        for ch in chunk:
+            if self.closed:
+                break
+            if not self._started:
+                if ch == '[':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._depth >= 2:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 2:
+                    self._buffer = [ch]
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    question = self._parse_object(''.join(self._buffer))
+                    self._buffer = []
+                    if question is not None:
+                        self.questions.append(question)
+                        completed.append(question)
+                elif self._depth == 0:
+                    self.closed = True
+        return completed
+
+    def _parse_object(self, text: str):
+        try:
+            return json_repair.loads(text)
+        except json.JSONDecodeError:
+            self.failed += 1
+            return None
+
+    @property
+    def in_object(self) -> bool:
+        """True if the text so far ends inside an unfinished question object."""
+        return self._depth >= 2
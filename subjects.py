@@ -0,0 +1,104 @@
+"""
+Subject registry.
+
+Everything that used to be copy-pasted across the per-subject scripts - paper prefix,
+folder names, extraction module, chapter list and annotation prompt - is looked up here.
+The prompt modules (process_*_paper.py) and chapter lists (batch_annotate_*.py) are
+imported lazily, so importing the registry does not pull in the Gemini SDK.
+
+    import subjects
+    science = subjects.get("science")
+    science.data_dir                     # science_data
+    science.chapters                     # batch_annotate_science.SCIENCE_CHAPTERS
+"""
+import importlib
+import pathlib
+
+YEARS = list(range(2025, 2010, -1))  # 2025 to 2011
+SHIFTS = ["i", "ii"]
+
+
+class Subject:
+    def __init__(self, name: str, prefix: str, label: str, extraction_module: str):
+        self.name = name
+        self.prefix = prefix
+        self.label = label
+        self.extraction_module = extraction_module
+
+        self.papers_dir = pathlib.Path(f"{name}_papers")
+        self.data_dir = pathlib.Path(f"{name}_data")
+        self.annotated_dir = pathlib.Path(f"{name}_data_annotated")
+        self.annotated_raw_dir = pathlib.Path(f"{name}_data_annotated_raw")
+        self.pro_dir = pathlib.Path(f"{name}_pro")
+        self.merged_path = self.pro_dir / f"{name}_all_years.json"
+        self.repeated_path = self.pro_dir / f"{name}_repeated.json"
+        self.related_path = self.pro_dir / f"{name}_related.bin"
+        self.related_keys_path = self.pro_dir / f"{name}_related_keys.json"
+        self.search_index_path = self.pro_dir / f"{name}_search.bin"
+        self.chapters_dir = pathlib.Path(f"{name}_pro_chapters")
+        self.types_dir = pathlib.Path(f"{name}_pro_types")
+        self.type_chapters_dir = pathlib.Path(f"{name}_pro_type_chapters")
+
+    def __repr__(self):
+        return f"Subject({self.name!r})"
+
+    # --- Extraction ---
+
+    def extraction(self):
+        """The process_*_paper module: `generate_extraction_prompt` and `logger`."""
+        return importlib.import_module(self.extraction_module)
+
+    @property
+    def mirrored_fields(self) -> dict:
+        """`{source: mirror}` fields the extraction prompt asks for once (empty for bilingual papers)."""
+        return getattr(self.extraction(), "MIRRORED_FIELDS", {})
+
+    def extraction_config(self, compact: bool = False) -> dict:
+        """Structured-output generation config for the subject's extraction prompt (see response_schemas.py)."""
+        import response_schemas
+        return response_schemas.extraction_config(self.extraction().QUESTION_TYPES, omit=self.mirrored_fields.values(),
+                                                  compact=compact)
+
+    def papers(self):
+        """`(input_pdf, output_json)` for every year/shift, newest first (PDFs may be missing)."""
+        for year in YEARS:
+            for shift in SHIFTS:
+                stem = f"{self.prefix}_{year}{shift}"
+                yield self.papers_dir / f"{stem}.pdf", self.data_dir / f"{stem}.json"
+
+    # --- Annotation ---
+
+    def _annotation_module(self):
+        return importlib.import_module(f"batch_annotate_{self.name}")
+
+    @property
+    def chapters(self) -> list:
+        return getattr(self._annotation_module(), f"{self.name.upper()}_CHAPTERS")
+
+    def annotation_prompt(self, questions: list) -> str:
+        build_prompt = getattr(self._annotation_module(), f"generate_{self.name}_annotation_prompt")
+        return build_prompt(self.chapters, questions)
+
+    def annotation_logger(self):
+        import utils
+        return utils.setup_logger(f'batch_annotate_{self.name}', f'logs/batch_annotate_{self.name}.log')
+
+
+SUBJECTS = {
+    s.name: s for s in [
+        Subject('science', 'sci', 'Science', 'process_paper'),
+        Subject('mathematics', 'math', 'Mathematics', 'process_paper'),
+        Subject('social_science', 'soc', 'Social Science', 'process_paper'),
+        Subject('hindi', 'hin', 'Hindi', 'process_hindi_paper'),
+        Subject('english', 'eng', 'English', 'process_english_paper'),
+        Subject('sanskrit', 'san', 'Sanskrit', 'process_sanskrit_paper'),
+    ]
+}
+NAMES = list(SUBJECTS)
+
+
+def get(name: str) -> Subject:
+    try:
+        return SUBJECTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown subject {name!r}; expected one of {', '.join(NAMES)}") from None
@@ -0,0 +1,41 @@
+"""
+Text normalization for matching questions across papers.
+
+The same question comes back year after year with different numbering, spacing,
+punctuation and Unicode spellings: precomposed vs. decomposed nukta letters,
+chandrabindu vs. anusvara, Devanagari vs. ASCII digits, zero-width joiners left by
+the PDF text layer. `normalize` folds all of these so that equal questions compare
+equal; `tokens` splits the result into words.
+"""
+import re
+import unicodedata
+
+_ZERO_WIDTH = re.compile("[\u200b-\u200d\u2060\ufeff\u00ad]")
+_DIGITS = str.maketrans("\u0966\u0967\u0968\u0969\u096a\u096b\u096c\u096d\u096e\u096f", "0123456789")
+_FOLDED = str.maketrans({
+    "\u093c": None,      # nukta: क़ -> क (NFC keeps these letters decomposed)
+    "\u0901": "\u0902",  # chandrabindu -> anusvara
+})
+# "1.", "(a)", "Q.3", "(क)" at the start of a question
+_LEADING_MARKER = re.compile(r"^\s*(?:q\s*\.?\s*[0-9]+\s*[.)]?|\(?(?:[0-9]+|[a-z]|[\u0915-\u0939])\s*[.)])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _is_separator(ch: str) -> bool:
+    # Punctuation (dandas included) and symbols; combining vowel signs are kept
+    return unicodedata.category(ch)[0] in "PSZC"
+
+
+def normalize(text: str) -> str:
+    """Lower-cased, NFC, nukta/chandrabindu folded, numbering and punctuation stripped, spaces collapsed."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text)
+    text = _ZERO_WIDTH.sub("", text).translate(_DIGITS).translate(_FOLDED).casefold()
+    text = _LEADING_MARKER.sub("", text)
+    text = "".join(" " if _is_separator(ch) else ch for ch in text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def tokens(text: str) -> list:
+    return normalize(text).split()
@@ -0,0 +1,106 @@
+"""
+Devanagari -> loose roman keys, so that "prakash ka paravartan" finds प्रकाश का परावर्तन.
+
+`to_roman` transliterates a normalized Devanagari word (textnorm.normalize) with the
+inherent vowel written out and then dropped where Hindi pronunciation drops it: at
+the end of a word (परावर्तन -> paraavartan) and, scanning right to left, between
+two consonants that are followed by a vowel (कमला -> kamlaa). `key` then folds the
+spelling differences students make when typing Hindi in Latin letters - long vowels
+(aa/a, ee/ii/i), sh/s, ph/f, w/v, doubled letters - so the romanized corpus word
+and the typed word reduce to the same string. `stem` strips inflectional endings
+from a key, so लड़की, लड़के, लड़कियाँ and a typed "ladki" all reduce to "ladk".
+"""
+import re
+
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_SIGNS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o",
+}
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "ळ": "l",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_VIRAMA = "्"
+_MARKS = {"ं": "n", "ँ": "n", "ः": "h", "ऽ": ""}
+
+_FOLDS = [
+    (re.compile(r"chh"), "ch"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"(.)\1+"), r"\1"),  # aa -> a, kk -> k
+]
+
+# Hindi inflections as they read after `key` (long vowels folded), longest first
+_ENDINGS = sorted("""
+    iyon iyan iyen aon aen ain ane ana ate ati ata ega egi enge
+    on en an ne na te ti ta a e i o u
+""".split(), key=len, reverse=True)
+
+
+def _syllables(word: str) -> list:
+    """`[(consonant roman or "", vowel roman or None)]`; None marks a dropped inherent vowel."""
+    units = []
+    for ch in word:
+        if ch in _CONSONANTS:
+            units.append([_CONSONANTS[ch], "a"])
+        elif ch in _SIGNS and units and units[-1][1] == "a":
+            units[-1][1] = _SIGNS[ch]
+        elif ch == _VIRAMA and units:
+            units[-1][1] = ""
+        elif ch in _VOWELS:
+            units.append(["", _VOWELS[ch]])
+        elif ch in _MARKS and units:
+            units[-1][1] = (units[-1][1] or "") + _MARKS[ch]
+        elif ch.isascii() and ch.isalnum():
+            units.append([ch, ""])
+    return units
+
+
+def to_roman(word: str) -> str:
+    """Romanization of one Devanagari word with final and medial schwa deletion."""
+    units = _syllables(word)
+    # Final schwa: परावर्तन -> paraavartan; kept in single-consonant words (न) and after a
+    # conjunct (सूर्य -> suurya)
+    if len(units) > 1 and units[-1][0] and units[-1][1] == "a" and units[-2][1] != "":
+        units[-1][1] = ""
+    # Medial schwa, right to left: V C a C V -> V C C V (कमला -> kamlaa, समझना -> samajhnaa)
+    for i in range(len(units) - 2, 0, -1):
+        prev, cur, nxt = units[i - 1], units[i], units[i + 1]
+        if cur[0] and cur[1] == "a" and prev[1] and nxt[0] and nxt[1]:
+            cur[1] = ""
+    return "".join(c + v for c, v in units)
+
+
+def key(roman: str) -> str:
+    """Folds a romanized word to its matching key (both typed and transliterated words go through it)."""
+    roman = roman.lower()
+    for pattern, replacement in _FOLDS:
+        roman = pattern.sub(replacement, roman)
+    return roman
+
+
+def stem(word_key: str) -> str:
+    """Strips one inflectional ending from a key, keeping at least three letters."""
+    for ending in _ENDINGS:
+        if word_key.endswith(ending) and len(word_key) - len(ending) >= 3:
+            return word_key[:-len(ending)]
+    return word_key
+
+
+def devanagari_key(word: str) -> str:
+    return key(to_roman(word))
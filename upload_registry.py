@@ -0,0 +1,201 @@
+"""
+Registry of File API uploads, keyed by the SHA-256 of the uploaded file.
+
+`process_question_paper` used to upload every PDF on every run and delete it right
+after. Uploads now go through `get_or_upload_async`: while a previous upload of the
+same bytes is still valid (the File API keeps files for 48 hours) its URI is reused
+by any stage or retry that needs it. Deletion is deferred to a reaper that removes
+uploads nobody has used for UPLOAD_IDLE_TTL.
+
+    .pipeline/uploads.sqlite3   sha256 -> file name, URI, expiry, last use
+
+Usage:
+    python upload_registry.py          # list registered uploads
+    python upload_registry.py reap     # delete idle uploads from the API
+    python upload_registry.py purge    # delete every registered upload from the API
+"""
+import asyncio
+import datetime
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import google.generativeai as genai
+import utils
+from response_cache import file_sha256
+
+DEFAULT_DB = ".pipeline/uploads.sqlite3"
+FILE_API_TTL = 48 * 3600      # File API retention
+EXPIRY_MARGIN = 2 * 3600      # don't hand out a URI that expires mid-generation
+UPLOAD_IDLE_TTL = 6 * 3600    # reaper deletes uploads unused for this long
+REAP_INTERVAL = 15 * 60
+
+
+class UploadRegistry:
+    def __init__(self, db_path: str = DEFAULT_DB):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " sha256 TEXT PRIMARY KEY, name TEXT, uri TEXT, display_name TEXT,"
+            " uploaded_at REAL, expires_at REAL, last_used REAL)"
+        )
+        self._db.commit()
+
+    def lookup(self, sha256: str):
+        """Returns (name, uri) of a still-valid upload of these bytes, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, uri FROM uploads WHERE sha256 = ? AND expires_at > ?",
+                (sha256, time.time() + EXPIRY_MARGIN),
+            ).fetchone()
+            if row:
+                self._db.execute("UPDATE uploads SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+                self._db.commit()
+        return row
+
+    def record(self, sha256: str, uploaded_file, display_name: str):
+        now = time.time()
+        expires_at = now + FILE_API_TTL
+        expiration_time = getattr(uploaded_file, "expiration_time", None)
+        if isinstance(expiration_time, datetime.datetime):
+            expires_at = expiration_time.timestamp()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, uploaded_file.name, uploaded_file.uri, display_name, now, expires_at, now),
+            )
+            self._db.commit()
+
+    def forget(self, sha256: str):
+        with self._lock:
+            self._db.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+            self._db.commit()
+
+    def entries(self) -> list:
+        with self._lock:
+            return self._db.execute(
+                "SELECT sha256, name, uri, display_name, uploaded_at, expires_at, last_used"
+                " FROM uploads ORDER BY last_used"
+            ).fetchall()
+
+    def mark_all_idle(self):
+        with self._lock:
+            self._db.execute("UPDATE uploads SET last_used = 0")
+            self._db.commit()
+
+    def reapable(self, idle_seconds: float) -> list:
+        """Uploads that have expired or have been idle for `idle_seconds`."""
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "SELECT sha256, name FROM uploads WHERE expires_at <= ? OR last_used <= ?",
+                (now + EXPIRY_MARGIN, now - idle_seconds),
+            ).fetchall()
+
+
+class RegisteredFile:
+    """The subset of the SDK's File object the pipeline uses."""
+
+    def __init__(self, name: str, uri: str):
+        self.name = name
+        self.uri = uri
+
+
+_registry = None
+_registry_lock = threading.Lock()
+_upload_locks = {}
+
+
+def get_upload_registry() -> UploadRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = UploadRegistry(os.environ.get("GEMINI_UPLOAD_DB", DEFAULT_DB))
+        return _registry
+
+
+async def get_or_upload_async(input_path: pathlib.Path, logger):
+    """
+    Returns an uploaded file for `input_path`, reusing a previous upload of the same bytes.
+
+    Concurrent callers for the same file in this process share one upload. Hashing the
+    PDF and the registry's sqlite calls run in a worker thread, off the event loop.
+    """
+    registry = await asyncio.to_thread(get_upload_registry)
+    sha256 = await asyncio.to_thread(file_sha256, input_path)
+    lock = _upload_locks.setdefault((id(asyncio.get_running_loop()), sha256), asyncio.Lock())
+
+    async with lock:
+        row = await asyncio.to_thread(registry.lookup, sha256)
+        if row:
+            name, uri = row
+            try:
+                # Cheap metadata call; confirms the file was not deleted behind our back
+                await asyncio.to_thread(genai.get_file, name)
+                logger.info(f"Reusing upload {name} for {input_path.name}")
+                return RegisteredFile(name, uri)
+            except Exception as e:
+                logger.info(f"Registered upload {name} is gone ({e}); uploading again")
+                await asyncio.to_thread(registry.forget, sha256)
+
+        logger.info("Uploading file to the File API...")
+        uploaded_file = await asyncio.to_thread(genai.upload_file, path=input_path, display_name=input_path.name)
+        await asyncio.to_thread(registry.record, sha256, uploaded_file, input_path.name)
+        logger.info(f"File uploaded successfully: {uploaded_file.uri}")
+        return RegisteredFile(uploaded_file.name, uploaded_file.uri)
+
+
+async def reap_async(logger=None, idle_seconds: float = UPLOAD_IDLE_TTL) -> int:
+    """Deletes expired or idle uploads from the API and the registry. Returns how many were removed."""
+    registry = await asyncio.to_thread(get_upload_registry)
+    removed = 0
+    for sha256, name in await asyncio.to_thread(registry.reapable, idle_seconds):
+        try:
+            await asyncio.to_thread(genai.delete_file, name)
+        except Exception as e:
+            # Already expired or deleted on the server side
+            if logger: logger.info(f"Could not delete {name}: {e}")
+        await asyncio.to_thread(registry.forget, sha256)
+        removed += 1
+    if removed and logger:
+        logger.info(f"🧹 Reaped {removed} idle uploads")
+    return removed
+
+
+async def reap_periodically(logger=None, interval: float = REAP_INTERVAL):
+    """Background task: reap idle uploads every `interval` seconds until cancelled."""
+    while True:
+        try:
+            await reap_async(logger)
+        except Exception as e:
+            if logger: logger.warning(f"Upload reaper failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    registry = get_upload_registry()
+
+    if command in ("reap", "purge"):
+        utils.configure_genai()
+        idle = 0 if command == "purge" else UPLOAD_IDLE_TTL
+        if command == "purge":
+            registry.mark_all_idle()
+        removed = asyncio.run(reap_async(idle_seconds=idle))
+        print(f"🧹 Deleted {removed} uploads")
+        return
+
+    now = time.time()
+    entries = registry.entries()
+    print(f"📤 {len(entries)} registered uploads")
+    for sha256, name, uri, display_name, uploaded_at, expires_at, last_used in entries:
+        print(f"   - {display_name:<20} {name:<24} expires in {(expires_at - now) / 3600:5.1f}h, "
+              f"idle {(now - last_used) / 60:.0f}min")
+
+
+if __name__ == "__main__":
+    main()
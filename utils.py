@@ -1,12 +1,17 @@
 import os
+import asyncio
+import copy
+import json
 import logging
 import time
 import random
-import re
 import google.generativeai as genai
 from logging.handlers import RotatingFileHandler
 import pathlib
 from dotenv import load_dotenv
+from json_repair import repair_json
+from rate_limiter import get_rate_limiter, is_rate_limit_error
+from response_cache import get_response_cache, cache_key, prompt_has_file_data, CachedResponse
 
 # Load environment variables
 load_dotenv()
@@ -81,9 +86,62 @@ def get_generative_model(model_name="models/gemini-3-flash-preview"):
     configure_genai()
     return genai.GenerativeModel(model_name=model_name)
 
-def generate_content_with_retry(model, prompt_parts, logger=None, max_retries=5):
+# Safety settings to avoid blocking on educational content
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+def _log(logger, level, msg):
+    if logger: getattr(logger, level)(msg)
+    else: print(msg)
+
+def _retry_wait(attempt, error, logger=None):
+    """Logs the retry message and returns how long to wait before the next attempt."""
+    if is_rate_limit_error(error):
+        # The shared limiter has already backed off; the next acquire waits out the cooldown
+        # and releases throttled callers one by one instead of all at once.
+        _log(logger, "info", f"⏳ Rate limit reached. Limiter backed off to {get_rate_limiter().status()}...")
+        return 0
+
+    # Use exponential backoff for other errors
+    wait_time = (5 ** attempt) + random.uniform(2, 5)
+    _log(logger, "info", f"⏳ Error occurred. Retrying in {wait_time:.1f}s...")
+    return wait_time
+
+def _cache_lookup(model, prompt_parts, source_files, logger=None, generation_config=None):
+    """Returns (cache key, cached response or None). The key is None when caching does not apply."""
+    cache = get_response_cache()
+    # A prompt that references an uploaded file is only cacheable if we know which bytes it points at
+    if cache is None or (prompt_has_file_data(prompt_parts) and not source_files):
+        return None, None
+    key = cache_key(getattr(model, "model_name", ""), prompt_parts, source_files or (), generation_config)
+    text = cache.get(key)
+    if text is None:
+        return key, None
+    _log(logger, "info", f"📦 Cache hit ({key[:12]}), skipping API call.")
+    return key, CachedResponse(text)
+
+def get_cached_response(model, prompt_parts, source_files=None, logger=None, generation_config=None):
+    """Returns a cached response for this prompt without calling the API, or None on a miss."""
+    return _cache_lookup(model, prompt_parts, source_files, logger, generation_config)[1]
+
+def _cache_store(key, model, response, logger=None):
+    if key is None:
+        return
+    try:
+        get_response_cache().put(key, response.text, getattr(model, "model_name", ""))
+    except Exception as e:
+        _log(logger, "warning", f"Could not cache response: {e}")
+
+def generate_content_with_retry(model, prompt_parts, logger=None, max_retries=5, source_files=None,
+                                generation_config=None):
     """
     Generates content using the provided model with retry logic for rate limits and errors.
+    Every attempt goes through the shared adaptive rate limiter (see rate_limiter.py), and
+    responses are served from / stored in the response cache (see response_cache.py).
     Automatic key rotation is disabled.
     
     Args:
@@ -91,91 +149,165 @@ def generate_content_with_retry(model, prompt_parts, logger=None, max_retries=5)
         prompt_parts: The prompt or parts to send.
         logger: Optional logger instance.
         max_retries: Maximum number of retries.
+        source_files: Local files behind any `file_data` parts, used to key the cache.
+        generation_config: Optional generation config, e.g. structured output from
+            response_schemas.py; part of the cache key.
         
     Returns:
         response object or None if failed.
     """
-    response = None
-    
+    key, cached = _cache_lookup(model, prompt_parts, source_files, logger, generation_config)
+    if cached:
+        return cached
+
+    limiter = get_rate_limiter()
     for attempt in range(max_retries):
+        limiter.acquire()
+        start = time.monotonic()
         try:
-            # Add safety settings to avoid blocking on educational content
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            ]
-            response = model.generate_content(prompt_parts, safety_settings=safety_settings)
+            response = model.generate_content(prompt_parts, safety_settings=SAFETY_SETTINGS,
+                                              generation_config=generation_config)
+            limiter.release(latency=time.monotonic() - start)
+            _cache_store(key, model, response, logger)
             return response
         except Exception as e:
-            error_str = str(e)
-            msg = f"⚠️ Attempt {attempt+1}/{max_retries} failed: {e}"
-            if logger: logger.warning(msg)
-            else: print(msg)
-            
-            # Use exponential backoff for all errors (including 429)
-            wait_time = (5 ** attempt) + random.uniform(2, 5) # Increased wait for 429 if no rotation
-            
-            if "429" in error_str or "Resource has been exhausted" in error_str:
-                msg = f"⏳ Rate limit reached. Retrying in {wait_time:.1f}s (manual rotation or wait required)..."
-            else:
-                msg = f"⏳ Error occurred. Retrying in {wait_time:.1f}s..."
+            limiter.release(throttled=is_rate_limit_error(e))
+            _log(logger, "warning", f"⚠️ Attempt {attempt+1}/{max_retries} failed: {e}")
+            time.sleep(_retry_wait(attempt, e, logger))
                 
-            if logger: logger.info(msg)
-            else: print(msg)
-            time.sleep(wait_time)
-                
-    if not response:
-        msg = "❌ All retries failed."
-        if logger: logger.error(msg)
-        else: print(msg)
-        return None
-    
-    return response
+    _log(logger, "error", "❌ All retries failed.")
+    return None
+
+async def generate_content_with_retry_async(model, prompt_parts, logger=None, max_retries=5, source_files=None,
+                                            generation_config=None):
+    """
+    Async counterpart of generate_content_with_retry.
+
+    Uses the SDK's native `generate_content_async` and waits with `asyncio.sleep`,
+    so a backing-off request never holds a thread.
+    """
+    key, cached = _cache_lookup(model, prompt_parts, source_files, logger, generation_config)
+    if cached:
+        return cached
+
+    limiter = get_rate_limiter()
+    for attempt in range(max_retries):
+        await limiter.acquire_async()
+        start = time.monotonic()
+        try:
+            response = await model.generate_content_async(prompt_parts, safety_settings=SAFETY_SETTINGS,
+                                                          generation_config=generation_config)
+            await limiter.release_async(latency=time.monotonic() - start)
+            _cache_store(key, model, response, logger)
+            return response
+        except Exception as e:
+            await limiter.release_async(throttled=is_rate_limit_error(e))
+            _log(logger, "warning", f"⚠️ Attempt {attempt+1}/{max_retries} failed: {e}")
+            await asyncio.sleep(_retry_wait(attempt, e, logger))
+
+    _log(logger, "error", "❌ All retries failed.")
+    return None
+
+class StreamedResponse:
+    """Response assembled from a streamed generation. `complete` is False if the stream broke off."""
+
+    def __init__(self, text: str, complete: bool, usage_metadata=None):
+        self.text = text
+        self.complete = complete
+        self.usage_metadata = usage_metadata
+        self.candidates = []
+
+async def stream_content_with_retry_async(model, prompt_parts, on_text, logger=None, max_retries=5, source_files=None,
+                                          generation_config=None):
+    """
+    Streaming variant of generate_content_with_retry_async (`stream=True`).
+
+    `on_text(text)` is called with every chunk as it arrives (or once with the whole
+    text on a cache hit). Attempts that fail before the first chunk are retried; a
+    failure mid-stream is not, since the caller has already consumed the chunks.
+
+    Returns:
+        StreamedResponse (or CachedResponse), or None if no attempt produced output.
+    """
+    key, cached = _cache_lookup(model, prompt_parts, source_files, logger, generation_config)
+    if cached:
+        on_text(cached.text)
+        return cached
+
+    limiter = get_rate_limiter()
+    for attempt in range(max_retries):
+        await limiter.acquire_async()
+        start = time.monotonic()
+        chunks = []
+        try:
+            response = await model.generate_content_async(prompt_parts, safety_settings=SAFETY_SETTINGS, stream=True,
+                                                          generation_config=generation_config)
+            async for chunk in response:
+                text = chunk.text
+                chunks.append(text)
+                on_text(text)
+            await limiter.release_async(latency=time.monotonic() - start)
+            streamed = StreamedResponse("".join(chunks), True, getattr(response, "usage_metadata", None))
+            _cache_store(key, model, streamed, logger)
+            return streamed
+        except Exception as e:
+            await limiter.release_async(throttled=is_rate_limit_error(e))
+            if chunks:
+                _log(logger, "error", f"❌ Stream broke off after {len(chunks)} chunks: {e}")
+                return StreamedResponse("".join(chunks), False)
+            _log(logger, "warning", f"⚠️ Attempt {attempt+1}/{max_retries} failed: {e}")
+            await asyncio.sleep(_retry_wait(attempt, e, logger))
+
+    _log(logger, "error", "❌ All retries failed.")
+    return None
+
+def add_usage(usage, response):
+    """Adds the response's token counts to a `{"prompt_tokens", "output_tokens"}` dict (no-op if usage is None)."""
+    metadata = getattr(response, "usage_metadata", None)
+    if usage is None or metadata is None:
+        return
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (getattr(metadata, "prompt_token_count", 0) or 0)
+    usage["output_tokens"] = usage.get("output_tokens", 0) + (getattr(metadata, "candidates_token_count", 0) or 0)
 
 # --- Data Processing ---
 
+def atomic_write_text(path, text: str):
+    """Writes `text` to a temp file next to `path` and renames it over `path`, so readers never see a half file."""
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def atomic_write_json(path, data):
+    """`json.dump(data, indent=4, ensure_ascii=False)` to `path`, atomically."""
+    atomic_write_text(path, json.dumps(data, indent=4, ensure_ascii=False))
+
+def expand_mirrored_fields(questions: list, mirrored: dict) -> list:
+    """
+    Copies each `source` field of every question to its `mirror` (e.g. `question` -> `prashna`)
+    right after the source, unless the model already emitted the mirror. Used for the
+    monolingual subjects, whose prompts ask for every text once (see MIRRORED_FIELDS in
+    process_hindi_paper.py / process_sanskrit_paper.py).
+    """
+    if not mirrored:
+        return questions
+    expanded = []
+    for q in questions:
+        if not isinstance(q, dict):
+            expanded.append(q)
+            continue
+        new_q = {}
+        for k, v in q.items():
+            new_q[k] = v
+            mirror = mirrored.get(k)
+            if mirror and mirror not in q:
+                new_q[mirror] = copy.deepcopy(v)
+        expanded.append(new_q)
+    return expanded
+
 def clean_json_response(raw_text: str) -> str:
-    """Extracts JSON content from a string, handling markdown code blocks and repairing common issues."""
-    match = re.search(r'```json\s*([\s\S]*?)\s*```', raw_text, re.DOTALL)
-    if match:
-        text = match.group(1).strip()
-    else:
-        text = raw_text.strip()
-    
-    # --- Repair Logic ---
-    
-    # 1. Fix unescaped backslashes (common in LaTeX outputs)
-    # Strategy: First, normalize all double backslashes to single ones to avoid triple-escaping.
-    # Then, escape all backslashes that are NOT part of a valid JSON escape.
-    text = text.replace('\\\\', '\\')
-    text = re.sub(r'\\(?![\\\"/bfnrtu])', r'\\\\', text)
-    
-    # 2. Fix trailing commas in objects and arrays
-    text = re.sub(r',\s*}', '}', text)
-    text = re.sub(r',\s*]', ']', text)
-    
-    # 3. Fix missing commas between objects or elements
-    text = re.sub(r'}\s*{', '}, {', text)
-    text = re.sub(r']\s*\[', '], [', text)
-    
-    # 4. Fallback: If there's still extra text, try to isolate the array or object
-    if not (text.startswith('[') or text.startswith('{')):
-        start_array = text.find('[')
-        start_obj = text.find('{')
-        
-        # Determine the earliest starting point
-        if start_array != -1 and (start_obj == -1 or start_array < start_obj):
-            start = start_array
-            end = text.rfind(']')
-        elif start_obj != -1:
-            start = start_obj
-            end = text.rfind('}')
-        else:
-            start = -1
-            
-        if start != -1 and end != -1 and end > start:
-            text = text[start:end+1]
-    
-    return text
+    """Extracts JSON content from a string, handling markdown code blocks and repairing common issues (see json_repair.py)."""
+    return repair_json(raw_text)
@@ -0,0 +1,68 @@
+"""
+Compact wire format for extraction output.
+
+Every question object repeats its field names (`sub_questions`, `anuprashna`,
+`instructions`, ...) and the model tends to pretty-print the array; both are
+output tokens that cost generation time on every paper. With `compact=True`,
+generate_extraction_prompt asks for one-letter keys, options as `[A, B, C, D]`
+arrays and minified JSON, and `decode` turns the response back into today's
+schema before anything is written, so every file on disk keeps the same shape:
+
+    {"id":"obj_1","t":"objective","q":"...","p":"...","o":["..","..","..",".."],"v":[...]}
+    -> {"id": "obj_1", "type": "objective", "question": "...", "prashna": "...",
+        "options": {"A": "..", ...}, "vikalpa": {"A": "..", ...}}
+
+`id` keeps its name: continuation and the streaming parser key on it.
+"""
+import textwrap
+
+# wire key -> schema key
+KEYS = {
+    "t": "type",
+    "q": "question",
+    "p": "prashna",
+    "o": "options",
+    "v": "vikalpa",
+    "s": "sub_questions",
+    "a": "anuprashna",
+    "c": "context",
+    "n": "instructions",
+}
+OPTION_LETTERS = "ABCDEFGH"
+_OPTION_FIELDS = {"options", "vikalpa"}
+
+
+def prompt_section(omit=()) -> str:
+    """
+    Instructions appended to an extraction prompt to request the compact format.
+
+    `omit` names fields the prompt does not ask for (the MIRRORED_FIELDS mirrors);
+    they are left out of the legend so it does not contradict the prompt.
+    """
+    legend = ", ".join(f'"{short}" for `{name}`' for short, name in KEYS.items() if name not in omit)
+    option_fields = " and ".join(f"`{name}`" for name in ("options", "vikalpa") if name not in omit)
+    return textwrap.dedent(f"""
+    **Output Format (Compact)**:
+        - Use these short keys instead of the field names above: {legend}. Keep "id" as it is.
+        - Write {option_fields} as arrays in A, B, C, D order instead of objects.
+        - Write minified JSON: no indentation, no line breaks inside an object, one question object after another.
+        - Omit fields that do not apply instead of writing empty values.
+    """)
+
+
+def decode_question(question):
+    """One question in the compact format -> the extraction schema. Other values pass through unchanged."""
+    if not isinstance(question, dict):
+        return question
+    decoded = {}
+    for key, value in question.items():
+        name = KEYS.get(key, key)
+        if name in _OPTION_FIELDS and isinstance(value, list):
+            value = dict(zip(OPTION_LETTERS, value))
+        decoded[name] = value
+    return decoded
+
+
+def decode(questions: list) -> list:
+    """Expands a compact extraction response. Objects already in the full schema are left as they are."""
+    return [decode_question(q) for q in questions]